@@ -0,0 +1,112 @@
+import os
+import json
+import hashlib
+import numpy as np
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFilter
+
+# Background images for ui.py. Every background is decoded and LANCZOS-resized once per
+# process, the blurred point-of-interest variant is memoized on disk per (image, poi_pos, poi_size)
+# so scene switches and POI redraws only pay for a PNG decode.
+
+BACKGROUND_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "backgrounds")
+BLUR_RADIUS = 10 # blur of the background outside the point of interest
+MASK_BLUR_RADIUS = 30 # soft edge of the point of interest
+
+
+@lru_cache(maxsize=16)
+def load_resized(path, size, mtime):
+    # mtime is part of the key, an edited file is decoded again
+    img = Image.open(path)
+    img = img.resize(size, Image.LANCZOS)
+    img.load()
+    return img
+
+
+@lru_cache(maxsize=16)
+def file_digest(path, mtime):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def resized_background(path, size):
+    """
+    Background image resized to the window.
+
+    Args:
+        path (str): Path of the background image.
+        size (tuple[int, int]): Window width and height in pixels.
+
+    Returns:
+        PIL.Image.Image: The shared resized image, do not modify it in place.
+    """
+    return load_resized(path, tuple(size), os.path.getmtime(path))
+
+
+@lru_cache(maxsize=16)
+def background_mean(path, size, mtime):
+    return np.mean(np.array(load_resized(path, size, mtime)), axis=(0, 1))
+
+
+def average_color(path, size):
+    # Mean RGB of the resized background, the panel colors are derived from it
+    return background_mean(path, tuple(size), os.path.getmtime(path))
+
+
+def poi_cache_key(path, size, poi_pos, poi_size):
+    key = [file_digest(path, os.path.getmtime(path)), list(size), [int(v) for v in poi_pos], int(poi_size),
+           BLUR_RADIUS, MASK_BLUR_RADIUS]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def compose_poi_background(img, poi_pos, poi_size):
+    # Sharp inside the point of interest, blurred outside, with a soft edge
+    blurred = img.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS))
+
+    mask = Image.new('L', img.size, 0)
+    draw = ImageDraw.Draw(mask)
+    x0 = poi_pos[0] - poi_size
+    y0 = poi_pos[1] - poi_size
+    x1 = poi_pos[0] + poi_size
+    y1 = poi_pos[1] + poi_size
+    draw.ellipse([x0, y0, x1, y1], fill=255)
+    mask = mask.filter(ImageFilter.GaussianBlur(radius=MASK_BLUR_RADIUS))
+
+    # merge
+    return Image.composite(img, blurred, mask)
+
+
+@lru_cache(maxsize=16)
+def load_poi_background(path, size, poi_pos, poi_size, use_cache, mtime):
+    cache_path = os.path.join(BACKGROUND_CACHE_DIR, poi_cache_key(path, size, poi_pos, poi_size) + ".png")
+    if use_cache and os.path.exists(cache_path):
+        img = Image.open(cache_path)
+        img.load()
+        return img
+
+    img = compose_poi_background(resized_background(path, size), poi_pos, poi_size)
+    if use_cache:
+        os.makedirs(BACKGROUND_CACHE_DIR, exist_ok=True)
+        # write then rename, a second process never reads a half written file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, format="PNG", compress_level=1)
+        os.replace(tmp_path, cache_path)
+    return img
+
+
+def poi_background(path, size, poi_pos, poi_size, use_cache=True):
+    """
+    Resized background blurred outside the point of interest, as drawn by UI.debug_draw_poi.
+
+    Args:
+        path (str): Path of the background image.
+        size (tuple[int, int]): Window width and height in pixels.
+        poi_pos (numpy.ndarray): Center of the point of interest in pixels.
+        poi_size (int): Radius of the point of interest in pixels.
+        use_cache (bool): Read and write the variant in BACKGROUND_CACHE_DIR.
+
+    Returns:
+        PIL.Image.Image: The shared composited image, do not modify it in place.
+    """
+    return load_poi_background(path, tuple(size), tuple(int(v) for v in poi_pos), int(poi_size), use_cache,
+                               os.path.getmtime(path))
@@ -0,0 +1,96 @@
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scene import Scene
+from solvers import SOLVERS, BUILDERS, solve_layout
+import main
+
+# Headless batch mode: optimize many scene files in a process pool and write the
+# optimal_results layouts as JSON, without opening any window.
+#
+#   python batch.py "scenes/*.json" "scenes_class/*.json" --out results --workers 4 --threads 1
+
+
+def solve_scene(scene_path, out_dir, backend, builder, threads, seed):
+    if seed is not None:
+        random.seed(seed)
+    start = time.perf_counter()
+
+    # workers stay quiet, their output would interleave with the batch summary
+    scene = Scene(scene_path, verbose=False)
+    app_ids = list(scene.apps.keys())
+    info = scene.get_info()
+    rele = main.calculate_automated_relevance(scene, verbose=False) if main.is_auto_rele else info["relevance"]
+
+    params = {"Threads": threads} if threads else None
+    optimal_results, objective = solve_layout(info, app_ids, rele, scene.LODS, main.rewards, main.poi_pan,
+                                              backend=backend, builder=builder, verbose=False, params=params)
+
+    # poi and question panel may be random per load, store them so the layout can be replayed
+    result = {
+        "scene": scene_path,
+        "solver": backend,
+        "objective": objective,
+        "poi_pos": [int(v) for v in scene.poi_pos],
+        "poi_size": int(scene.poi_size),
+        "q_pos": [int(v) for v in scene.q_pos],
+        "overlapping_poi": int(scene.count_poi_overlaps(optimal_results)),
+        "optimal_results": optimal_results
+    }
+    out_path = os.path.join(out_dir, os.path.splitext(os.path.relpath(scene_path))[0] + ".json")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as file:
+        json.dump(result, file, indent=4)
+    return scene_path, out_path, objective, time.perf_counter() - start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimize scene layouts in parallel, without UI.")
+    parser.add_argument("patterns", nargs="+", help='scene files or glob patterns, e.g. "scenes/*.json"')
+    parser.add_argument("--out", default="results", help="output folder for the layout JSON files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="Gurobi threads per worker, 0 lets Gurobi decide")
+    parser.add_argument("--solver", choices=list(SOLVERS), default=main.solver_backend)
+    parser.add_argument("--builder", choices=BUILDERS, default=main.model_builder)
+    parser.add_argument("--seed", type=int, default=None, help="seed for scenes without fixed poi/question positions")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    scene_paths = sorted({path for pattern in args.patterns for path in glob.glob(pattern)})
+    if not scene_paths:
+        print(f"No scene files match: {' '.join(args.patterns)}")
+        sys.exit(1)
+
+    # scenes reference their apps and backgrounds relative to the project folder, like main.py
+    out_dir = os.path.abspath(args.out)
+    scene_paths = [os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(__file__))) for path in scene_paths]
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    start = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(solve_scene, path, out_dir, args.solver, args.builder, args.threads, args.seed): path
+            for path in scene_paths
+        }
+        for future in as_completed(futures):
+            try:
+                scene_path, out_path, objective, elapsed = future.result()
+                print(f"{scene_path:<32} objective {objective:10.4f}  {elapsed:6.2f}s  -> {out_path}")
+            except BaseException as e:
+                # UI.load_scene exits on unreadable files
+                failed.append(futures[future])
+                print(f"{futures[future]:<32} failed: {e!r}")
+
+    print(f"Solved {len(scene_paths) - len(failed)}/{len(scene_paths)} scenes in {time.perf_counter() - start:.2f}s")
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,42 @@
+import sys
+import os
+import glob
+import time
+
+from scene import Scene
+from solvers import SOLVERS, solve_layout
+from main import calculate_automated_relevance, rewards, poi_pan
+
+# Wall time and optimality of every solver backend against the Gurobi model.
+#
+#   python benchmark_solvers.py [repeats] [scene.json ...]
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    repeats = int(sys.argv[1]) if len(sys.argv) >= 2 else 5
+    scene_paths = sys.argv[2:] or sorted(glob.glob("scenes/*.json"))
+
+    rows = []
+    for scene_path in scene_paths:
+        scene = Scene(scene_path)
+        app_ids = list(scene.apps.keys())
+        info = scene.get_info()
+        rele = calculate_automated_relevance(scene)
+
+        results = {}
+        for backend in SOLVERS:
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                layout, objective = solve_layout(info, app_ids, rele, scene.LODS, rewards, poi_pan,
+                                                 backend=backend, verbose=False)
+                times.append(time.perf_counter() - start)
+            results[backend] = (min(times), objective)
+
+        reference = results["gurobi"][1]
+        for backend, (wall_time, objective) in results.items():
+            rows.append((scene_path, backend, wall_time, objective, objective - reference))
+
+    print(f"\n{'scene':<28} {'backend':<8} {'best of ' + str(repeats):>12} {'objective':>12} {'vs gurobi':>12}")
+    for scene_path, backend, wall_time, objective, gap in rows:
+        print(f"{scene_path:<28} {backend:<8} {wall_time*1000:10.1f}ms {objective:12.6f} {gap:+12.2e}")
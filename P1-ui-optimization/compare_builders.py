@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+
+from scene import Scene
+from optimizer import BUILDERS, build_model
+from main import calculate_automated_relevance, rewards, poi_pan
+
+# Parity check between the model builders in optimizer.py:
+# every builder has to reach the same optimal objective on every scene.
+#
+#   python compare_builders.py [scene.json ...]
+
+TOLERANCE = 1e-6
+
+
+def compare_scene(scene_path):
+    scene = Scene(scene_path)
+    app_ids = list(scene.apps.keys())
+    info = scene.get_info()
+    rele = calculate_automated_relevance(scene)
+
+    objectives = {}
+    for builder in BUILDERS:
+        start = time.perf_counter()
+        m, x = build_model(info, app_ids, rele, scene.LODS, rewards, poi_pan, builder=builder)
+        build_time = time.perf_counter() - start
+        m.Params.OutputFlag = 0
+        m.optimize()
+        objectives[builder] = m.ObjVal
+        print(f"{scene_path:<24} {builder:<8} build {build_time*1000:8.1f}ms  "
+              f"solve {m.Runtime*1000:8.1f}ms  objective {m.ObjVal:.6f}")
+    return objectives
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    scene_paths = sys.argv[1:] or [f"scenes/scene-{i}.json" for i in range(1, 5)]
+
+    mismatches = []
+    for scene_path in scene_paths:
+        objectives = compare_scene(scene_path)
+        reference = objectives[BUILDERS[0]]
+        if any(abs(obj - reference) > TOLERANCE for obj in objectives.values()):
+            mismatches.append(scene_path)
+
+    if mismatches:
+        print(f"objective mismatch on: {', '.join(mismatches)}")
+        sys.exit(1)
+    print("all builders agree")
@@ -0,0 +1,104 @@
+import numpy as np
+from functools import lru_cache
+
+# Grid geometry as integer bitmasks. Cell (xIdx, yIdx) is bit (xIdx * ROWS + yIdx), so the
+# default 8x6 grid fits in 48 bits and every overlap test is a single AND.
+
+# Footprint size (in blocks) of each LoD as (width, height)
+LOD_SIZES = np.array([
+    [1, 1],
+    [2, 1],
+    [2, 2]
+])
+
+
+def cell_bit(xIdx, yIdx, rows):
+    return 1 << (xIdx * rows + yIdx)
+
+
+def cells_to_mask(cells):
+    # Boolean (COLS, ROWS) array to bitmask
+    mask = 0
+    for bit in np.flatnonzero(cells).tolist():
+        mask |= 1 << bit
+    return mask
+
+
+def mask_to_cells(mask):
+    # Bit indices (xIdx * ROWS + yIdx) set in a bitmask
+    cells = []
+    bit = 0
+    while mask:
+        if mask & 1:
+            cells.append(bit)
+        mask >>= 1
+        bit += 1
+    return cells
+
+
+def overlaps(mask_a, mask_b):
+    # Works on ints and elementwise on footprint tables
+    return (mask_a & mask_b) != 0
+
+
+@lru_cache(maxsize=None)
+def footprint_table(cols, rows, lods=3):
+    """
+    Precomputed footprint bitmask of every (lod, xIdx, yIdx).
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: Bitmasks of shape (LODS, COLS, ROWS), int64 if the
+        grid fits in 63 bits and Python ints otherwise, and a boolean table of the same shape
+        that is False where the footprint runs off the grid. Cells outside the grid are not
+        part of the mask. Both tables are read-only.
+    """
+    dtype = np.int64 if cols * rows <= 63 else object
+    masks = np.zeros((lods, cols, rows), dtype=dtype)
+    inside = np.zeros((lods, cols, rows), dtype=bool)
+    for lod, (width, height) in enumerate(LOD_SIZES[:lods].tolist()):
+        for xIdx in range(cols):
+            for yIdx in range(rows):
+                mask = 0
+                for dx in range(min(width, cols - xIdx)):
+                    for dy in range(min(height, rows - yIdx)):
+                        mask |= cell_bit(xIdx + dx, yIdx + dy, rows)
+                masks[lod, xIdx, yIdx] = mask
+                inside[lod, xIdx, yIdx] = xIdx + width <= cols and yIdx + height <= rows
+    masks.setflags(write=False)
+    inside.setflags(write=False)
+    return masks, inside
+
+
+def footprint_mask(lod, placement, cols, rows):
+    masks, _ = footprint_table(cols, rows)
+    return int(masks[lod, placement[0], placement[1]])
+
+
+def cell_rects(cols, rows, grid_a):
+    # Top-left pixel corner of every cell, both with shape (COLS, ROWS)
+    xs, ys = np.meshgrid(np.arange(cols), np.arange(rows), indexing="ij")
+    return xs * grid_a, ys * grid_a
+
+
+def circle_rectangles_overlap(circle_x, circle_y, circle_radius, rect_x, rect_y, rect_width, rect_height):
+    # Vectorized circle_rectangle_overlap, all rect arguments broadcast together
+    closest_x = np.clip(circle_x, rect_x, rect_x + rect_width)
+    closest_y = np.clip(circle_y, rect_y, rect_y + rect_height)
+    distance_squared = (circle_x - closest_x)**2 + (circle_y - closest_y)**2
+    return distance_squared <= circle_radius**2
+
+
+def rect_mask(pos, size, cols, rows, grid_a):
+    # Cells strictly overlapping a pixel rectangle, e.g. the questions panel or the Apps button
+    rect_x, rect_y = cell_rects(cols, rows, grid_a)
+    hits = ((rect_x < pos[0] + size[0]) & (rect_x + grid_a > pos[0]) &
+            (rect_y < pos[1] + size[1]) & (rect_y + grid_a > pos[1]))
+    return cells_to_mask(hits)
+
+
+def circle_mask(center, radius, cols, rows, grid_a):
+    # Cells touching a circle, e.g. the ROI. A footprint touches the circle
+    # exactly when one of its cells does, so footprint & circle_mask is the overlap test.
+    rect_x, rect_y = cell_rects(cols, rows, grid_a)
+    hits = circle_rectangles_overlap(center[0], center[1], radius, rect_x, rect_y, grid_a, grid_a)
+    return cells_to_mask(hits)
@@ -0,0 +1,229 @@
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+from scipy import sparse
+
+from terms import precompute_terms, objective_coefficients, feasible_placements, MAX_PLACED
+from geometry import footprint_table, mask_to_cells
+from solvers import BUILDERS
+
+
+def occupancy_matrix(cols, rows, lods=3):
+    # Sparse (COLS*ROWS, LODS*COLS*ROWS) matrix from the footprint bitmasks,
+    # entry is 1 if the placement covers the cell
+    footprints, _ = footprint_table(cols, rows, lods)
+    cells, placements = [], []
+    for placement, mask in enumerate(footprints.ravel().tolist()):
+        for cell in mask_to_cells(mask):
+            cells.append(cell)
+            placements.append(placement)
+    return sparse.csr_matrix(
+        (np.ones(len(cells)), (cells, placements)),
+        shape=(cols * rows, lods * cols * rows)
+    )
+
+
+def build_model_vars(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100):
+    # One addVar per feasible (app, lod, xIdx, yIdx), x is a dict keyed by that tuple
+    cols, rows = info["columns"], info["rows"]
+    feasible = feasible_placements(info, lods)
+    placements = [tuple(int(i) for i in p) for p in zip(*np.nonzero(feasible))]
+
+    m = gp.Model("ui_optimizer")
+
+    # Creates the decision variables, infeasible placements never get one
+    x = {}
+    for app in app_ids:
+        for lod, xIdx, yIdx in placements:
+            x[app, lod, xIdx, yIdx] = m.addVar(vtype=GRB.BINARY, name="x_%s_%s_%s_%s" % (app, lod, xIdx, yIdx))
+
+    #  4 elements placed
+    m.addConstr(gp.quicksum(x.values()) <= MAX_PLACED)
+
+    #  Each element can only be displayed in one level of detail and one position
+    for app in app_ids:
+        m.addConstr(gp.quicksum(x[app, lod, xIdx, yIdx] for lod, xIdx, yIdx in placements) <= 1)
+
+    # No overlapping elements considering LoD size: collect the variables covering each cell
+    footprints, _ = footprint_table(cols, rows, lods)
+    covering = [[] for _ in range(cols * rows)]
+    for (app, lod, xIdx, yIdx), var in x.items():
+        for cell in mask_to_cells(int(footprints[lod, xIdx, yIdx])):
+            covering[cell].append(var)
+    for cell_vars in covering:
+        m.addConstr(gp.quicksum(cell_vars) <= 1)
+
+    # Coefficient tensors masked to the feasible placements, in the same order as x
+    terms = precompute_terms(info, rele, app_ids, lods, poi_pan)
+    x_vars = list(x.values())
+
+    # 1. Reward proximity to question panel
+    questionProximityTerm = gp.LinExpr(terms["question_proximity"][:, feasible].ravel().tolist(), x_vars)
+    # 2. Relevance term
+    relevanceTerm = gp.LinExpr(terms["relevance"][:, feasible].ravel().tolist(), x_vars)
+    # 3.LoD reward with normalization
+    lodRewardTerm = gp.LinExpr(terms["lod_reward"][:, feasible].ravel().tolist(), x_vars)
+    # 4.ROI
+    roiAvoidanceTerm = gp.LinExpr(terms["roi_avoidance"][:, feasible].ravel().tolist(), x_vars)
+
+    m.ModelSense = GRB.MAXIMIZE
+    m.setObjective(
+        rewards[0]*questionProximityTerm +
+        rewards[1]*relevanceTerm +
+        rewards[2]*lodRewardTerm +
+        roiAvoidanceTerm,
+        GRB.MAXIMIZE
+    )
+    m.update()
+    return m, x
+
+
+def add_layout_constraints(m, x, placements, n_apps, lods=3):
+    # Constraints of the matrix model, x is an MVar over (app, placement in the
+    # boolean (LODS, COLS, ROWS) mask `placements`), app-major
+    cols, rows = placements.shape[1:]
+    n_placements = int(placements.sum())
+
+    #  4 elements placed
+    m.addConstr(x.sum() <= MAX_PLACED)
+
+    #  Each element can only be displayed in one level of detail and one position
+    per_app = sparse.kron(sparse.eye(n_apps), np.ones((1, n_placements)), format="csr")
+    m.addConstr(per_app @ x <= 1)
+
+    # No overlapping elements considering LoD size
+    occupancy = occupancy_matrix(cols, rows, lods)[:, np.flatnonzero(placements)]
+    m.addConstr(sparse.hstack([occupancy] * n_apps, format="csr") @ x <= 1)
+
+
+def build_model_matrix(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100):
+    # Same model as build_model_vars, built with the matrix API.
+    # x is an MVar over (app, feasible placement), app-major.
+    feasible = feasible_placements(info, lods)
+    n_apps = len(app_ids)
+
+    m = gp.Model("ui_optimizer")
+    x = m.addMVar(n_apps * int(feasible.sum()), vtype=GRB.BINARY, name="x")
+    add_layout_constraints(m, x, feasible, n_apps, lods)
+
+    terms = precompute_terms(info, rele, app_ids, lods, poi_pan)
+    coeffs = objective_coefficients(terms, rewards)
+    m.setObjective(coeffs[:, feasible].ravel() @ x, GRB.MAXIMIZE)
+    m.update()
+    return m, x
+
+
+def build_model(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100, builder="matrix"):
+    if builder == "vars":
+        return build_model_vars(info, app_ids, rele, lods, rewards, poi_pan)
+    if builder == "matrix":
+        return build_model_matrix(info, app_ids, rele, lods, rewards, poi_pan)
+    raise ValueError(f"unknown model builder: {builder}, expected one of {BUILDERS}")
+
+
+def layout_from_values(values, app_ids, placements):
+    # optimal_results from the solution vector of an MVar over (app, placement in `placements`)
+    shape = (len(app_ids),) + placements.shape
+    selected = np.flatnonzero(np.broadcast_to(placements, shape))[values > 0.5]
+    optimal_results = []
+    for a, lod, xIdx, yIdx in zip(*np.unravel_index(selected, shape)):
+        optimal_results.append({
+            "name": app_ids[a],
+            "lod": int(lod),
+            "placement": [int(xIdx), int(yIdx)] # This specifies a row and column for placement, rather than a pixel value
+        })
+    return optimal_results
+
+
+def get_layout(m, x, app_ids, info, lods=3):
+    # Reads the solution of either builder back into the optimal_results layout
+    if not isinstance(x, dict):
+        return layout_from_values(x.X, app_ids, feasible_placements(info, lods))
+
+    optimal_results = []
+    for (app, lod, xIdx, yIdx), value in zip(x.keys(), m.getAttr("X", list(x.values()))):
+        if value > 0.5:
+            optimal_results.append({
+                "name": app,
+                "lod": lod,
+                "placement": [xIdx, yIdx] # This specifies a row and column for placement, rather than a pixel value
+            })
+    return optimal_results
+
+
+class LayoutOptimizer:
+    """
+    Keeps one Gurobi model alive while the point of interest and the questions panel move.
+
+    Every in-grid placement gets a variable once. Placements covering the questions panel or
+    the Apps button are switched off through their upper bound instead of being pruned, so
+    an update only rewrites the objective coefficients that changed and the bounds, then
+    re-solves with the previous layout as MIP start.
+
+    Usage:
+        layout_optimizer = LayoutOptimizer(scene_UI.get_info(), app_ids, rele)
+        optimal_results = layout_optimizer.solve()
+        optimal_results = layout_optimizer.update(poi_pos=[400, 300], q_pos=[0, 200])
+    """
+
+    def __init__(self, info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100, verbose=False):
+        self.info = dict(info)
+        self.app_ids = list(app_ids)
+        self.rele = rele
+        self.lods = lods
+        self.rewards = rewards
+        self.poi_pan = poi_pan
+
+        _, self.placements = footprint_table(info["columns"], info["rows"], lods)
+        self.m = gp.Model("ui_optimizer")
+        if not verbose:
+            self.m.Params.OutputFlag = 0
+        self.x = self.m.addMVar(len(self.app_ids) * int(self.placements.sum()), vtype=GRB.BINARY, name="x")
+        add_layout_constraints(self.m, self.x, self.placements, len(self.app_ids), lods)
+
+        self.coeffs = self.objective()
+        self.ub = self.upper_bounds()
+        self.x.Obj = self.coeffs
+        self.x.UB = self.ub
+        self.m.ModelSense = GRB.MAXIMIZE
+        self.values = None
+
+    def objective(self):
+        terms = precompute_terms(self.info, self.rele, self.app_ids, self.lods, self.poi_pan)
+        return objective_coefficients(terms, self.rewards)[:, self.placements].ravel()
+
+    def upper_bounds(self):
+        feasible = feasible_placements(self.info, self.lods)[self.placements]
+        return np.tile(feasible, len(self.app_ids)).astype(float)
+
+    def update(self, poi_pos=None, poi_size=None, q_pos=None):
+        # Moves the ROI and/or the questions panel and re-solves
+        if poi_pos is not None:
+            self.info["roi_pos"] = np.asarray(poi_pos)
+        if poi_size is not None:
+            self.info["roi_rad"] = poi_size
+        if q_pos is not None:
+            self.info["questions_pos"] = np.asarray(q_pos)
+
+        coeffs = self.objective()
+        changed = np.flatnonzero(coeffs != self.coeffs)
+        if len(changed) > 0:
+            self.x[changed].Obj = coeffs[changed]
+        self.coeffs = coeffs
+
+        if q_pos is not None:
+            ub = self.upper_bounds()
+            changed = np.flatnonzero(ub != self.ub)
+            if len(changed) > 0:
+                self.x[changed].UB = ub[changed]
+            self.ub = ub
+        return self.solve()
+
+    def solve(self):
+        # Previous layout as MIP start, minus placements that are blocked now.
+        # Dropping a widget keeps a layout feasible, so the start is always feasible.
+        if self.values is not None:
+            self.x.Start = np.where(self.ub > 0, self.values, 0.0)
+        self.m.optimize()
+        self.values = np.round(self.x.X)
+        return layout_from_values(self.values, self.app_ids, self.placements)
@@ -0,0 +1,173 @@
+import sys
+import json
+import numpy as np
+import random
+import os
+from app import App
+from geometry import footprint_mask, circle_mask, overlaps
+
+# Scene model without any rendering: grid constants, apps, questions, point of interest
+# and the overlap checks. The optimizer, batch.py and the other scripts only need this part,
+# so they can load scenes without tkinter or PIL. ui.UI draws a Scene with Tk.
+
+
+class Scene:
+    LODS = 3
+    WINDOW_WIDTH, WINDOW_HEIGHT = 800, 600
+    BLOCK_SIZE = 100
+    COLS, ROWS = 8, 6
+    QUESTIONS_WIDTH, QUESTIONS_HEIGHT = 200, 200
+    BTN_ALL_POS = [10, 10]
+    BTN_ALL_WIDTH, BTN_ALL_HEIGHT = 80, 80
+
+    ALL_WIDTH, ALL_HEIGHT = 150, 500
+    # ALL_WIDTH, ALL_HEIGHT = 600, 500
+    
+    POI_RADIUS_MIN, POI_RADIUS_MAX = 50, 200
+    POI_PLACEMENT_PADDING = 100
+    ALL_BORDER = 1
+
+    def __init__(self, path="scene-3.json", verbose=True):
+        self.load_scene(path, verbose=verbose)
+        self.qi = 0 
+        self.overlapping_poi = 0
+        self.opening_all = False
+
+    # Retrieves key UI-related attributes used for layout, rendering, and optimization.
+    # Returns a dictionary containing:
+    # - "columns" (int): Number of columns in the UI grid.
+    # - "rows" (int): Number of rows in the UI grid.
+    # - "block_size" (int): Size of each block in the grid in pixels.
+    # - "questions_pos" (numpy.ndarray): X and Y position of the question panel in the UI in pixels.
+    # - "questions_size" (numpy.ndarray): Width and height of the question panel in pixels.
+    # - "btn_all_pos" (numpy.ndarray): Position of the "Apps" button to its top left corner in pixels.
+    # - "btn_all_size" (numpy.ndarray): Width and height of the "Apps" button in pixels.
+    # - "roi_pos" (numpy.ndarray): Position of the Region of Interest (ROI) in the UI in pixels.
+    # - "roi_rad" (int): Radius of the Region of Interest (ROI) in pixels.
+    # - "relevance" (dict[str, float]): A dictionary mapping application names to their relevance scores.
+    def get_info(self):
+        return {
+            "columns": self.COLS,
+            "rows": self.ROWS,
+            "block_size": self.BLOCK_SIZE, 
+            "questions_pos": self.q_pos,
+            "questions_size": np.array([self.QUESTIONS_WIDTH, self.QUESTIONS_HEIGHT]),
+            "btn_all_pos": self.BTN_ALL_POS,
+            "btn_all_size": np.array([self.BTN_ALL_WIDTH, self.BTN_ALL_HEIGHT]),
+            "roi_pos": self.poi_pos,
+            "roi_rad": self.poi_size, 
+            "relevance": self.relevance
+        }
+
+    def load_scene(self, path="scene.json", shuffle_questions=True, verbose=True):
+        try:
+            with open(path, 'r') as file:
+                scene = json.load(file)
+            self.app_path = self.resolve_path(path, scene["app_path"])
+            self.apps = self.load_apps(self.app_path)
+            self.env_path = self.resolve_path(path, scene["env_path"])
+            
+            if "poi_pos" in scene: 
+                self.poi_pos = np.array(scene["poi_pos"])
+            else: 
+                self.poi_pos = np.array([
+                    random.randint(self.POI_PLACEMENT_PADDING,self.WINDOW_WIDTH - self.POI_PLACEMENT_PADDING),
+                    random.randint(self.POI_PLACEMENT_PADDING,self.WINDOW_HEIGHT - self.POI_PLACEMENT_PADDING)
+                ])
+            if "poi_size" in scene:
+                self.poi_size = scene["poi_size"]
+            else: 
+                self.poi_size = random.randint(self.POI_RADIUS_MIN, self.POI_RADIUS_MAX)
+            # grid cells touching the point of interest, for the bitmask overlap checks
+            self.poi_mask = circle_mask(self.poi_pos, self.poi_size, self.COLS, self.ROWS, self.BLOCK_SIZE)
+            
+            if "q_pos" in scene: 
+                self.q_pos = np.array(scene["q_pos"])
+            else: 
+                valid_placements = self.get_valid_question_placements()
+                self.q_pos = self.BLOCK_SIZE * np.array(valid_placements[
+                    random.randint(0, len(valid_placements) - 1)
+                ])
+                #self.q_pos = self.BLOCK_SIZE * np.array([
+                #    random.randint(0,self.COLS - 2),
+                #    random.randint(0,self.ROWS - 2)
+                #])
+                if verbose:
+                    print(self.q_pos)
+            
+            self.init_relevance(scene["relevance"])
+            
+            self.questions = self.load_questions(scene["questions"])
+            if shuffle_questions:
+                random.shuffle(self.questions)
+        
+        except FileNotFoundError:
+            print(f"File not found: {path}")
+            sys.exit(1)
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from file: {path}")
+            sys.exit(1)
+
+    def resolve_path(self, scene_path, path):
+        # Scenes reference their files as "scenes/...". Scene folders with another name
+        # (e.g. scenes_class) keep apps/ and backgrounds/ next to the scene file instead.
+        local_path = os.path.join(os.path.dirname(scene_path), *path.replace("\\", "/").split("/")[1:])
+        return local_path if os.path.exists(local_path) else path
+
+    def load_questions(self, questions):
+        num_questions = len(questions)
+        for qi in range(num_questions):
+            app = self.apps[questions[qi]["app"]]
+            a = app.info[questions[qi]["lod"]]
+            questions[qi]["a"] = a
+        return questions
+        
+    def load_apps(self, path="apps.json"):
+        try:
+            apps = {}
+            with open(path, 'r') as file:
+                data = json.load(file)
+                for entry in data: 
+                    apps[entry["app"]] = App(entry["app"], entry["info"])
+            return apps
+        except FileNotFoundError:
+            print(f"File not found: {path}")
+            sys.exit(1)
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from file: {path}")
+            sys.exit(1)
+        
+    def init_relevance(self, relevance):
+        self.relevance = relevance
+        for app in self.apps.keys():
+            if app not in self.relevance:
+                self.relevance[app] = 0.0
+
+    def is_ui_overlap(self, name, placement, lod):
+        is_overlap = overlaps(footprint_mask(lod, placement, self.COLS, self.ROWS), self.poi_mask)
+        if is_overlap:
+            self.overlapping_poi += 1
+        #print(name, "overlapping poi:", is_overlap)
+
+    def is_question_overlap(self, placement):
+        # Check if the question panel overlaps with the "All Apps" button at position [0,0]
+        if placement == [0, 0]:
+            return True
+
+        # Check if the question panel (2x2, same footprint as LoD 2) overlaps with the point of interest
+        return overlaps(footprint_mask(2, placement, self.COLS, self.ROWS), self.poi_mask)
+
+    def get_valid_question_placements(self):
+        valid_pos = []
+        for xIdx in range(self.COLS - 2):
+            for yIdx in range(self.ROWS - 2):
+                if not self.is_question_overlap([xIdx, yIdx]):
+                    valid_pos.append([xIdx, yIdx])
+        return valid_pos
+
+    def count_poi_overlaps(self, optimal_results):
+        # Number of widgets of a layout that overlap the point of interest, without drawing them
+        return sum(
+            overlaps(footprint_mask(result["lod"], result["placement"], self.COLS, self.ROWS), self.poi_mask)
+            for result in optimal_results
+        )
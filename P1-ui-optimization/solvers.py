@@ -0,0 +1,120 @@
+import numpy as np
+
+from terms import precompute_terms, objective_coefficients, feasible_placements, MAX_PLACED
+from geometry import footprint_table
+
+
+########################################################
+#############         gurobi           #################
+########################################################
+
+# model builders of optimizer.build_model, listed here so choosing one does not import gurobipy
+BUILDERS = ["vars", "matrix"]
+
+
+def solve_gurobi(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100, builder="matrix", verbose=True, params=None):
+    # gurobipy is only imported when this backend is used, machines without a license can still use "bnb".
+    # params are Gurobi parameters set on the model, e.g. {"Threads": 1}.
+    from optimizer import build_model, get_layout
+
+    m, x = build_model(info, app_ids, rele, lods, rewards, poi_pan, builder=builder)
+    if not verbose:
+        m.Params.OutputFlag = 0
+    for name, value in (params or {}).items():
+        m.setParam(name, value)
+    m.optimize()
+    return get_layout(m, x, app_ids, info, lods), m.ObjVal
+
+
+########################################################
+#############     branch and bound     #################
+########################################################
+
+def placement_masks(info, lods=3):
+    # Footprint bitmask of every feasible (lod, xIdx, yIdx)
+    footprints, _ = footprint_table(info["columns"], info["rows"], lods)
+    return {
+        tuple(placement): int(footprints[tuple(placement)])
+        for placement in np.argwhere(feasible_placements(info, lods)).tolist()
+    }
+
+
+def solve_branch_and_bound(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100, verbose=True, **kwargs):
+    """
+    Exact depth-first branch and bound over the precomputed placement scores.
+
+    Apps are visited from the best to the worst best-placement score, each one is either
+    skipped or placed at a position that does not overlap the current occupancy bitmask.
+    A placement with a score <= 0 never improves the objective, so only positive ones are
+    candidates. The bound adds the best scores of the next free slots, which is valid because
+    the apps are sorted by that score.
+
+    Returns:
+        tuple[list[dict], float]: The optimal_results layout and its objective value.
+    """
+    scores = objective_coefficients(precompute_terms(info, rele, app_ids, lods, poi_pan), rewards)
+    masks = placement_masks(info, lods)
+
+    candidates = []
+    for a, app in enumerate(app_ids):
+        options = [(float(scores[a][placement]), mask, placement) for placement, mask in masks.items()]
+        options = sorted((o for o in options if o[0] > 0), key=lambda o: o[0], reverse=True)
+        if options:
+            candidates.append((app, options))
+    candidates.sort(key=lambda c: c[1][0][0], reverse=True)
+
+    n = len(candidates)
+    best_scores = [options[0][0] for _, options in candidates] + [0.0] * MAX_PLACED
+
+    # optimistic value of filling `slots` slots from apps i, i+1, ...
+    def bound(i, slots):
+        return sum(best_scores[i:i + slots])
+
+    best = {"value": 0.0, "layout": []}
+
+    def search(i, slots, occupied, value, layout):
+        if value > best["value"]:
+            best["value"], best["layout"] = value, list(layout)
+        if i == n or slots == 0 or value + bound(i, slots) <= best["value"]:
+            return
+
+        app, options = candidates[i]
+        rest = bound(i + 1, slots - 1)
+        for score, mask, placement in options:
+            if value + score + rest <= best["value"]:
+                break
+            if mask & occupied:
+                continue
+            layout.append((app, placement))
+            search(i + 1, slots - 1, occupied | mask, value + score, layout)
+            layout.pop()
+
+        # leave app i off the main interface
+        search(i + 1, slots, occupied, value, layout)
+
+    search(0, MAX_PLACED, 0, 0.0, [])
+
+    order = {app: i for i, app in enumerate(app_ids)}
+    optimal_results = []
+    for app, (lod, xIdx, yIdx) in sorted(best["layout"], key=lambda item: order[item[0]]):
+        optimal_results.append({
+            "name": app,
+            "lod": lod,
+            "placement": [xIdx, yIdx] # This specifies a row and column for placement, rather than a pixel value
+        })
+    if verbose:
+        print(f"Branch and bound: best objective {best['value']:.12e}")
+    return optimal_results, best["value"]
+
+
+SOLVERS = {
+    "gurobi": solve_gurobi,
+    "bnb": solve_branch_and_bound
+}
+
+
+def solve_layout(info, app_ids, rele, lods=3, rewards=(5, 3, 3), poi_pan=100, backend="gurobi", **kwargs):
+    # Pluggable entry point, backend is one of SOLVERS
+    if backend not in SOLVERS:
+        raise ValueError(f"unknown solver backend: {backend}, expected one of {list(SOLVERS)}")
+    return SOLVERS[backend](info, app_ids, rele, lods, rewards, poi_pan, **kwargs)
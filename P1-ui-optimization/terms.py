@@ -0,0 +1,96 @@
+import numpy as np
+
+from geometry import footprint_table, cell_rects, rect_mask, circle_mask, overlaps
+
+# Maximum number of applications shown on the main interface
+MAX_PLACED = 4
+
+# Center offsets (in blocks) of a widget placed at (xIdx, yIdx) for each LoD:
+# LoD 0 is 1x1, LoD 1 is 1x2 (two columns), LoD 2 is 2x2.
+LOD_CENTER_OFFSETS = np.array([
+    [0.5, 0.5],
+    [1.0, 0.5],
+    [1.0, 1.0]
+])
+
+def widget_centers(cols, rows, grid_a, lods=3):
+    # Pixel center of every (lod, xIdx, yIdx) placement, shape (LODS, COLS, ROWS, 2)
+    rect_x, rect_y = cell_rects(cols, rows, grid_a)
+    offsets = LOD_CENTER_OFFSETS[:lods] * grid_a
+    return np.stack([
+        rect_x[None] + offsets[:, 0, None, None],
+        rect_y[None] + offsets[:, 1, None, None]
+    ], axis=-1)
+
+
+def precompute_terms(info, rele, app_ids, lods=3, poi_pan=100):
+    """
+    Computes the objective coefficients of every placement in one vectorized pass.
+
+    Args:
+        info (dict): Scene geometry as returned by UI.get_info().
+        rele (dict[str, float]): Relevance of each application.
+        app_ids (list[str]): Applications, in the order of the first tensor axis.
+        lods (int): Number of levels of detail.
+        poi_pan (float): Penalty for a placement overlapping the ROI.
+
+    Returns:
+        dict[str, numpy.ndarray]: Coefficient tensors of shape (apps, LODS, COLS, ROWS) for
+        "question_proximity", "relevance", "lod_reward" and "roi_avoidance".
+    """
+    cols, rows = info["columns"], info["rows"]
+    grid_a = info["block_size"]
+    shape = (len(app_ids), lods, cols, rows)
+    app_rele = np.array([rele[app] for app in app_ids], dtype=float)
+
+    # 1. proximity to question panel, distances normalized over all placements
+    q_center = np.asarray(info["questions_pos"]) + np.asarray(info["questions_size"]) / 2
+    centers = widget_centers(cols, rows, grid_a, lods)
+    dist_to_questions = np.sqrt(np.sum((centers - q_center)**2, axis=-1))
+    q_min_dist, q_max_dist = dist_to_questions.min(), dist_to_questions.max()
+    normalized_dist = (dist_to_questions - q_min_dist) / (q_max_dist - q_min_dist)
+    question_proximity = app_rele[:, None, None, None] * (1 - normalized_dist)[None]
+
+    # 2. relevance
+    relevance = np.broadcast_to(app_rele[:, None, None, None], shape)
+
+    # 3. LoD reward: relevance * LoD ratio, normalized by its bounds
+    max_lod_reward = max(rele.values()) * 1.0
+    min_lod_reward = min(rele.values()) * 1/3
+    lod_ratio = np.arange(1, lods + 1) / 3
+    lod_reward = ((app_rele[:, None] * lod_ratio[None] - min_lod_reward) /
+                  (max_lod_reward - min_lod_reward))
+    lod_reward = np.broadcast_to(lod_reward[:, :, None, None], shape)
+
+    # 4. ROI: penalize every placement whose footprint touches the circle
+    footprints, _ = footprint_table(cols, rows, lods)
+    roi_overlap = overlaps(footprints, circle_mask(info["roi_pos"], info["roi_rad"], cols, rows, grid_a))
+    roi_avoidance = np.broadcast_to(np.where(roi_overlap, -poi_pan, 0.0)[None], shape)
+
+    return {
+        "question_proximity": question_proximity,
+        "relevance": relevance,
+        "lod_reward": lod_reward,
+        "roi_avoidance": roi_avoidance
+    }
+
+
+def objective_coefficients(terms, rewards=(5, 3, 3)):
+    # Weighted sum of the term tensors, i.e. the objective score of every single placement
+    return (
+        rewards[0]*terms["question_proximity"] +
+        rewards[1]*terms["relevance"] +
+        rewards[2]*terms["lod_reward"] +
+        terms["roi_avoidance"]
+    )
+
+
+def feasible_placements(info, lods=3):
+    # Placements that fit inside the grid and keep the questions panel and the Apps button free,
+    # boolean tensor of shape (LODS, COLS, ROWS). Only these get a decision variable.
+    cols, rows = info["columns"], info["rows"]
+    grid_a = info["block_size"]
+    blocked_cells = (rect_mask(info["questions_pos"], info["questions_size"], cols, rows, grid_a) |
+                     rect_mask(info["btn_all_pos"], info["btn_all_size"], cols, rows, grid_a))
+    footprints, inside = footprint_table(cols, rows, lods)
+    return inside & ~overlaps(footprints, blocked_cells)
@@ -1,17 +1,15 @@
 import sys 
-import json
 import numpy as np
 import tkinter as tk
 from tkinter import font
-from PIL import Image, ImageTk, ImageDraw
+from PIL import ImageTk
 import csv
 from datetime import datetime
 import time
-import random
 import re
 import os
-from app import App
-from PIL import Image, ImageDraw, ImageFilter
+from scene import Scene
+from background import resized_background, average_color, poi_background
 
 # Constants for delay. Do not change
 DELAY_LOD = 150
@@ -293,54 +291,8 @@ class UILogger:
         print("\n=== FINAL SCORE ===")
         print(score)
 
-class UI:
-    LODS = 3
-    WINDOW_WIDTH, WINDOW_HEIGHT = 800, 600
-    BLOCK_SIZE = 100
-    COLS, ROWS = 8, 6
-    QUESTIONS_WIDTH, QUESTIONS_HEIGHT = 200, 200
-    BTN_ALL_POS = [10, 10]
-    BTN_ALL_WIDTH, BTN_ALL_HEIGHT = 80, 80
-
-    ALL_WIDTH, ALL_HEIGHT = 150, 500
-    # ALL_WIDTH, ALL_HEIGHT = 600, 500
-    
-    POI_RADIUS_MIN, POI_RADIUS_MAX = 50, 200
-    POI_PLACEMENT_PADDING = 100
-    ALL_BORDER = 1
-
-    def __init__(self, path="scene-3.json"):
-        self.load_scene(path)
-        self.qi = 0 
-        self.overlapping_poi = 0
-        self.opening_all = False
-
-    # Retrieves key UI-related attributes used for layout, rendering, and optimization.
-    # Returns a dictionary containing:
-    # - "columns" (int): Number of columns in the UI grid.
-    # - "rows" (int): Number of rows in the UI grid.
-    # - "block_size" (int): Size of each block in the grid in pixels.
-    # - "questions_pos" (numpy.ndarray): X and Y position of the question panel in the UI in pixels.
-    # - "questions_size" (numpy.ndarray): Width and height of the question panel in pixels.
-    # - "btn_all_pos" (numpy.ndarray): Position of the "Apps" button to its top left corner in pixels.
-    # - "btn_all_size" (numpy.ndarray): Width and height of the "Apps" button in pixels.
-    # - "roi_pos" (numpy.ndarray): Position of the Region of Interest (ROI) in the UI in pixels.
-    # - "roi_rad" (int): Radius of the Region of Interest (ROI) in pixels.
-    # - "relevance" (dict[str, float]): A dictionary mapping application names to their relevance scores.
-    def get_info(self):
-        return {
-            "columns": self.COLS,
-            "rows": self.ROWS,
-            "block_size": self.BLOCK_SIZE, 
-            "questions_pos": self.q_pos,
-            "questions_size": np.array([self.QUESTIONS_WIDTH, self.QUESTIONS_HEIGHT]),
-            "btn_all_pos": self.BTN_ALL_POS,
-            "btn_all_size": np.array([self.BTN_ALL_WIDTH, self.BTN_ALL_HEIGHT]),
-            "roi_pos": self.poi_pos,
-            "roi_rad": self.poi_size, 
-            "relevance": self.relevance
-        }
-
+# Tk renderer of a Scene, everything that needs a window lives here
+class UI(Scene):
     def init_app(self, optimal_main=[], debug_poi=True):
         # Initialize the user interface window
         self.root = tk.Tk()
@@ -465,12 +417,9 @@ class UI:
 
     
     def init_background(self):
-        img = Image.open(self.env_path)
-        img = img.resize((UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT), Image.LANCZOS)
+        img = resized_background(self.env_path, (UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT))
         
-        img_array = np.array(img)
-        average_color = np.mean(img_array, axis=(0,1))
-        normalized_color = gamma_correction(average_color, gamma=2.2)
+        normalized_color = gamma_correction(average_color(self.env_path, (UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT)), gamma=2.2)
         
         brightened_color = np.minimum(normalized_color * 1.2, 255).astype(int)
         darkened_color = np.maximum(normalized_color * 0.45, 2).astype(int)
@@ -530,149 +479,17 @@ class UI:
 
 
 
-    def load_scene(self, path="scene.json", shuffle_questions=True):
-        try:
-            with open(path, 'r') as file:
-                scene = json.load(file)
-            self.apps = self.load_apps(scene["app_path"])
-            self.env_path = scene["env_path"]
-            
-            if "poi_pos" in scene: 
-                self.poi_pos = np.array(scene["poi_pos"])
-            else: 
-                self.poi_pos = np.array([
-                    random.randint(self.POI_PLACEMENT_PADDING,self.WINDOW_WIDTH - self.POI_PLACEMENT_PADDING),
-                    random.randint(self.POI_PLACEMENT_PADDING,self.WINDOW_HEIGHT - self.POI_PLACEMENT_PADDING)
-                ])
-            if "poi_size" in scene:
-                self.poi_size = scene["poi_size"]
-            else: 
-                self.poi_size = random.randint(self.POI_RADIUS_MIN, self.POI_RADIUS_MAX)
-            
-            if "q_pos" in scene: 
-                self.q_pos = np.array(scene["q_pos"])
-            else: 
-                valid_placements = self.get_valid_question_placements()
-                self.q_pos = self.BLOCK_SIZE * np.array(valid_placements[
-                    random.randint(0, len(valid_placements) - 1)
-                ])
-                #self.q_pos = self.BLOCK_SIZE * np.array([
-                #    random.randint(0,self.COLS - 2),
-                #    random.randint(0,self.ROWS - 2)
-                #])
-                print(self.q_pos)
-            
-            self.init_relevance(scene["relevance"])
-            
-            self.questions = self.load_questions(scene["questions"])
-            if shuffle_questions:
-                random.shuffle(self.questions)
-        
-        except FileNotFoundError:
-            print(f"File not found: {path}")
-            sys.exit(1)
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from file: {path}")
-            sys.exit(1)
-
-    def load_questions(self, questions):
-        num_questions = len(questions)
-        for qi in range(num_questions):
-            app = self.apps[questions[qi]["app"]]
-            a = app.info[questions[qi]["lod"]]
-            questions[qi]["a"] = a
-        return questions
-        
-    def load_apps(self, path="apps.json"):
-        try:
-            apps = {}
-            with open(path, 'r') as file:
-                data = json.load(file)
-                for entry in data: 
-                    apps[entry["app"]] = App(entry["app"], entry["info"])
-            return apps
-        except FileNotFoundError:
-            print(f"File not found: {path}")
-            sys.exit(1)
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from file: {path}")
-            sys.exit(1)
-        
-    def init_relevance(self, relevance):
-        self.relevance = relevance
-        for app in self.apps.keys():
-            if app not in self.relevance:
-                self.relevance[app] = 0.0
-
     def debug_draw_poi(self): 
-        img = Image.open(self.env_path)
-        img = img.resize((UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT), Image.LANCZOS)
+        # blurred variant is memoized per (image, poi_pos, poi_size), see background.py
+        final = poi_background(self.env_path, (UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT), self.poi_pos, self.poi_size)
 
-        blurred = img.filter(ImageFilter.GaussianBlur(radius=10))
-        
-        mask = Image.new('L', (UI.WINDOW_WIDTH, UI.WINDOW_HEIGHT), 0)
-        draw = ImageDraw.Draw(mask)
-        
         x0 = self.poi_pos[0] - self.poi_size
         y0 = self.poi_pos[1] - self.poi_size
         x1 = self.poi_pos[0] + self.poi_size
         y1 = self.poi_pos[1] + self.poi_size
         
-        draw.ellipse([x0, y0, x1, y1], fill=255)
-        mask = mask.filter(ImageFilter.GaussianBlur(radius=30)) 
-        
-        # merge
-        final = Image.composite(img, blurred, mask)
-        
         # transform to photoimage and display
         self.env_img = ImageTk.PhotoImage(final)
         self.env_canvas.create_image(0, 0, anchor="nw", image=self.env_img)
 
         self.env_canvas.create_oval(x0, y0, x1, y1, outline="grey", width=0.5, dash=5)
-
-
-    def circle_rectangle_overlap(self, circle_x, circle_y, circle_radius, rect_x, rect_y, rect_width, rect_height):
-        # Find the closest point on the rectangle to the circle's center
-        closest_x = max(rect_x, min(circle_x, rect_x + rect_width))
-        closest_y = max(rect_y, min(circle_y, rect_y + rect_height))
-
-        # Calculate the distance between the circle's center and the closest point
-        distance_x = circle_x - closest_x
-        distance_y = circle_y - closest_y
-        distance_squared = distance_x**2 + distance_y**2
-
-        # Check if the distance is less than or equal to the circle's radius
-        return distance_squared <= circle_radius**2
-
-    def is_ui_overlap(self, name, placement, lod):
-        circle_x, circle_y, circle_radius = self.poi_pos[0], self.poi_pos[1], self.poi_size
-        rect_x, rect_y = placement[0] * self.BLOCK_SIZE, placement[1] * self.BLOCK_SIZE
-        rect_width, rect_height = self.BLOCK_SIZE, self.BLOCK_SIZE
-        if lod > 0:
-            rect_width = 2 * self.BLOCK_SIZE
-        if lod > 1: 
-            rect_height = 2 * self.BLOCK_SIZE
-        is_overlap = self.circle_rectangle_overlap(circle_x, circle_y, circle_radius, rect_x, rect_y, rect_width, rect_height)
-        if is_overlap:
-            self.overlapping_poi += 1
-        #print(name, "overlapping poi:", is_overlap)
-
-    def is_question_overlap(self, placement):
-        # Check if the question panel overlaps with the "All Apps" button at position [0,0]
-        if placement == [0, 0]:
-            return True
-
-        # Check if the question panel overlaps with the point of interest
-        circle_x, circle_y, circle_radius = self.poi_pos[0], self.poi_pos[1], self.poi_size
-        rect_x, rect_y = placement[0] * self.BLOCK_SIZE, placement[1] * self.BLOCK_SIZE
-        rect_width = 2 * self.BLOCK_SIZE
-        rect_height = 2 * self.BLOCK_SIZE
-        return self.circle_rectangle_overlap(circle_x, circle_y, circle_radius, rect_x, rect_y, rect_width, rect_height)
-
-    def get_valid_question_placements(self):
-        valid_pos = []
-        for xIdx in range(self.COLS - 2):
-            for yIdx in range(self.ROWS - 2):
-                if not self.is_question_overlap([xIdx, yIdx]):
-                    valid_pos.append([xIdx, yIdx])
-        return valid_pos
\ No newline at end of file
@@ -2,8 +2,39 @@
 
 #include "Arduino_BMI270_BMM150.h"
 
+// 1: framed binary samples (see sensor_protocol.py), 0: ASCII CSV lines
+#define BINARY_STREAM 1
+
+#if BINARY_STREAM
+#define BAUD_RATE 115200
+#else
+#define BAUD_RATE 9600
+#endif
+
+// little-endian, 30 bytes: sync, sequence, aX,aY,aZ,gX,gY,gZ, CRC of sequence and values
+struct __attribute__((packed)) Frame {
+  uint8_t sync[2];
+  uint16_t seq;
+  float values[6];
+  uint16_t crc;
+};
+
+Frame frame = {{0xA5, 0x5A}, 0, {0}, 0};
+
+// CRC-16/CCITT-FALSE: poly 0x1021, init 0xFFFF
+uint16_t crc16(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+  while (length--) {
+    crc ^= (uint16_t)(*data++) << 8;
+    for (int i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD_RATE);
   while (!Serial);
 
   if (!IMU.begin()) {
@@ -22,6 +53,17 @@ void loop() {
     IMU.readAcceleration(aX, aY, aZ);
     IMU.readGyroscope(gX, gY, gZ);
 
+#if BINARY_STREAM
+    frame.values[0] = aX;
+    frame.values[1] = aY;
+    frame.values[2] = aZ;
+    frame.values[3] = gX;
+    frame.values[4] = gY;
+    frame.values[5] = gZ;
+    frame.crc = crc16((const uint8_t *)&frame.seq, sizeof(frame.seq) + sizeof(frame.values));
+    Serial.write((const uint8_t *)&frame, sizeof(frame));
+    frame.seq++;
+#else
     // print the data in CSV format
     Serial.print(aX, 3);
     Serial.print(',');
@@ -35,6 +77,7 @@ void loop() {
     Serial.print(',');
     Serial.print(gZ, 3);
     Serial.println();
+#endif
   }
 }
 
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from inference import InferenceEngine, MicroBatcher, model_paths
+
+# Latency of one live prediction: model.predict (old path) against InferenceEngine,
+# and the per-window cost when windows of both hands / several sessions are micro-batched.
+#
+#   python benchmark_inference.py [model_name] [repeats]
+
+window_size = 8
+model_name = 'a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978'
+input_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "offlinetest", "input_data.csv")
+
+
+def recorded_windows(n):
+    # Windows from the offline recording, normalized like live_keras.process_data
+    data = pd.read_csv(input_file).to_numpy(dtype=np.float32)[:, :12]
+    scale = np.tile(np.array([2.0] * 3 + [500.0] * 3, dtype=np.float32), 2)
+    data = np.clip(data / scale, -1, 1)
+    starts = np.arange(n) % (len(data) - window_size)
+    return np.stack([data[i:i + window_size] for i in starts])
+
+
+def latency(fn, windows):
+    times = []
+    for window in windows:
+        start = time.perf_counter()
+        fn(window)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2:
+        model_name = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) >= 3 else 200
+    model_path, _ = model_paths(model_name)
+
+    model = tf.keras.models.load_model(model_path)
+    engine = InferenceEngine(model_path, model=model)
+    windows = recorded_windows(repeats)
+
+    results = {
+        "model.predict": latency(lambda w: model.predict(w[np.newaxis], verbose=0), windows[:50]),
+        "model(x)": latency(lambda w: model(w[np.newaxis], training=False).numpy(), windows),
+        "engine": latency(engine.predict_proba, windows),
+    }
+
+    print(f"{'path':<24} {'median':>10} {'p95':>10}")
+    for name, times in results.items():
+        print(f"{name:<24} {np.median(times):8.3f}ms {np.percentile(times, 95):8.3f}ms")
+
+    # both hands / several sessions: n windows pending at once, one call
+    for n in (2, 8, 32):
+        batches = windows[:n * (repeats // n)].reshape(-1, n, window_size, 12)
+        times = latency(engine.predict_proba, batches) / n
+        print(f"{'engine batch of ' + str(n):<24} {np.median(times):8.3f}ms {np.percentile(times, 95):8.3f}ms  per window")
+
+    batcher = MicroBatcher(engine)
+    start = time.perf_counter()
+    futures = [batcher.submit(window) for window in windows]
+    batched = np.stack([future.result() for future in futures])
+    elapsed = (time.perf_counter() - start) * 1000 / len(windows)
+    batcher.close()
+    print(f"{'MicroBatcher':<24} {elapsed:8.3f}ms {'':>10}  per window, {len(windows)} submitted at once")
+
+    # same class for every window on every path
+    reference = model.predict(windows, verbose=0)
+    for name, probabilities in [("engine", engine.predict_proba(windows)), ("MicroBatcher", batched)]:
+        assert np.array_equal(np.argmax(reference, axis=1), np.argmax(probabilities, axis=1)), name
+        print(f"{name}: max abs diff to model.predict {np.abs(reference - probabilities).max():.2e}")
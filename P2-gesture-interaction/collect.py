@@ -1,4 +1,3 @@
-import serial
 from collections import deque
 import numpy as np
 import pickle
@@ -8,99 +7,43 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import os
 import matplotlib as mpl
+from serial_reader import DualSerialReader
+from recorder import RecordingWriter, convert_recordings
 
 
 ############### data recording ################
-recording = {"active": False, "letter": None, "file": None}
-recording_lock = threading.Lock()
+recording = {"active": False, "letter": None}
 
 run_timestamp = str(time.time()).replace(".", "-")
 data_folder_path = os.path.join("./data", run_timestamp)
 os.makedirs(data_folder_path, exist_ok=True)
 
+# writes .npy segments on its own thread, converted to <letter>.csv on quit
+recorder = RecordingWriter(data_folder_path)
+
 
 ############### serial reading ################
 ARDUINO_PORT_LEFT = '/dev/cu.usbmodem13401'  # left
 ARDUINO_PORT_RIGHT = '/dev/cu.usbmodem13201'  # right
 
-ser_left = serial.Serial(ARDUINO_PORT_LEFT, 9600)
-ser_right = serial.Serial(ARDUINO_PORT_RIGHT, 9600)
+# "binary" for arduino_stream.ino with BINARY_STREAM 1 (115200 baud), "ascii" for CSV lines (9600 baud)
+SERIAL_PROTOCOL = "binary"
+
+# one reader thread per board, samples are paired by receipt time
+reader = DualSerialReader(ARDUINO_PORT_LEFT, ARDUINO_PORT_RIGHT, protocol=SERIAL_PROTOCOL)
 
 ############### data processing ################
 buffer = deque(maxlen=100)
 for _ in range(buffer.maxlen):
     buffer.append(np.zeros(12)) 
 
-def parse_sensor_line(line, label_acc="ACC:", label_gyr="GYR:"):
-    """
-    input a line of sensor data: "ACC:0.24,-0.38,0.88; GYR:4.64,-6.53,1.04"
-    output 2 numpy array：(acc_values, gyr_values)
-    return none if parsing failed
-    """
-    parts = line.split(';')
-    if len(parts) != 2:
-        return None
-    # ACC
-    acc_part = parts[0].strip()
-    if not acc_part.startswith(label_acc):
-        return None
-    acc_values_str = acc_part[len(label_acc):].strip()
-    try:
-        acc_values = [float(x) for x in acc_values_str.split(',') if x]
-    except Exception:
-        return None
-
-    # GYR
-    gyr_part = parts[1].strip()
-    if not gyr_part.startswith(label_gyr):
-        return None
-    gyr_values_str = gyr_part[len(label_gyr):].strip()
-    try:
-        gyr_values = [float(x) for x in gyr_values_str.split(',') if x]
-    except Exception:
-        return None
-
-    if len(acc_values) != 3 or len(gyr_values) != 3:
-        return None
-
-    # Normalize
-    acc_values = np.array(acc_values, dtype=np.float32)
-    gyr_values = np.array(gyr_values, dtype=np.float32)
-
-    return acc_values, gyr_values
-
 def read_serial():
     """double board data reading"""
-    while True:
-        try:
-            line_left = ser_left.readline().decode('utf-8').strip()
-            line_right = ser_right.readline().decode('utf-8').strip()
-        
-            parsed_left = parse_sensor_line(line_left)
-            parsed_right = parse_sensor_line(line_right)
-            
-            if parsed_left is None or parsed_right is None:
-                continue
-            
-            combined = np.concatenate([
-                parsed_left[0],  # left acc
-                parsed_left[1],  # left gyr
-                parsed_right[0], # right acc
-                parsed_right[1]  # right gyr
-            ])
-            
-            buffer.append(combined)
-            
-            timestamp = time.time()
-            with recording_lock:
-                if recording["active"] and recording["file"] is not None:
-                    csv_line = ",".join(map(str, combined))
-                    recording["file"].write(f"{csv_line},{timestamp}\n")
-                    recording["file"].flush()
-                    
-        except Exception as e:
-            print(f"Serial Error: {str(e)}")
-            time.sleep(0.1)
+    # frame: L-Acc, L-Gyr, R-Acc, R-Gyr; timestamp: receipt of its later sample
+    for timestamp, combined in reader.frames():
+        buffer.append(combined)
+        # only queued here, see recorder.py
+        recorder.write(timestamp, combined)
 
 ############### visualization ################
 fig, ax = plt.subplots(figsize=(12, 6))
@@ -161,35 +104,34 @@ def on_key_press(event):
     key = event.key.lower()
     if key == 'q':
         plt.close()
-        
+        print(reader.stats())
         return
     if len(key) != 1 or not key.isalpha():
         return
-    with recording_lock:
-        if not recording["active"]:
-            # lets go
-            recording["active"] = True
-            recording["letter"] = key
-            filename = os.path.join(data_folder_path, f"{key}.csv")
-            recording["file"] = open(filename, "w")
-            # 12 dimentions
-            header = ",".join(labels) + ",timestamp\n"
-            recording["file"].write(header)
-            ax.set_title(f"Recording [{key.upper()}]", color='#FF4444', fontweight='bold')
-        else:
-            # stop
-            if recording["letter"] == key:
-                recording["active"] = False
-                if recording["file"]:
-                    recording["file"].close()
-                    recording["file"] = None
-                ax.set_title("Dual Board Sensor Data", color='#333333')         
+    if not recording["active"]:
+        # lets go
+        recording["active"] = True
+        recording["letter"] = key
+        recorder.start_recording(key)
+        ax.set_title(f"Recording [{key.upper()}]", color='#FF4444', fontweight='bold')
+    else:
+        # stop
+        if recording["letter"] == key:
+            recording["active"] = False
+            recorder.stop_recording()
+            ax.set_title("Dual Board Sensor Data", color='#333333')         
     fig.canvas.draw_idle()
 
 
 ############### main loop ################
+reader.start()
+recorder.start()
 serial_thread = threading.Thread(target=read_serial, daemon=True)
 serial_thread.start()
 fig.canvas.mpl_connect('key_press_event', on_key_press)
 ani = animation.FuncAnimation(fig, animate, interval=20, blit=True)
-plt.show()
\ No newline at end of file
+plt.show()
+reader.close()
+recorder.close()
+for path in convert_recordings(data_folder_path):
+    print(f"Saved {path}")
\ No newline at end of file
@@ -0,0 +1,198 @@
+import os
+import sys
+import glob
+import json
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+##############################################
+############ gesture dataset store ###########
+##############################################
+
+# All recordings packed into one store, read back memory-mapped:
+#
+#   features.npy     (N, 12) float32, normalized to [-1, 1] like normalize() in live_keras.py
+#   raw.npy          (N, 12) float32, sensor units, NaN for recordings only kept normalized
+#   timestamps.npy   (N,) float64
+#   index.npy        one row per recording: user, letter, start, end, normalized source
+#   sources.json     the CSVs it was compiled from
+#
+# Recordings are stored sorted by user and letter, one row range each. Rebuild after collecting:
+#
+#   python dataset.py
+
+P2_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(P2_DIR, ".cache", "dataset")
+# (pattern, already normalized); the user of a recording is the name of its folder
+DEFAULT_SOURCES = [
+    (os.path.join(P2_DIR, "data", "*", "*.csv"), False),
+    (os.path.join(P2_DIR, "processed_data", "*.csv"), True),
+]
+INDEX_DTYPE = np.dtype([("user", "U32"), ("letter", "U8"), ("start", "<i8"), ("end", "<i8"), ("normalized", "?")])
+N_FEATURES = 12
+
+
+def load_recording(input_file):
+    """Load a recording into (n, 12) sensor values and (n,) timestamps, skipping the header and bad lines"""
+    with open(input_file, 'r') as f:
+        first_field = f.readline().split(',')[0].strip()
+    try:
+        float(first_field)
+        has_header = False
+    except ValueError:
+        has_header = bool(first_field)
+    # round_trip parses floats exactly like float(), so timestamps are written back unchanged
+    df = pd.read_csv(input_file, header=None, skiprows=1 if has_header else 0,
+                     float_precision="round_trip", on_bad_lines="skip")
+    data = df.to_numpy(dtype=np.float64)
+    if data.shape[1] != 13:
+        raise ValueError(f"{input_file}: expected 12 sensor values + timestamp, got {data.shape[1]} columns")
+    data = data[~np.isnan(data).any(axis=1)]
+    return data[:, :12], data[:, 12]
+
+
+def normalize_rows(sensor_values):
+    """normalize() for all rows at once, columns are L-Acc, L-Gyr, R-Acc, R-Gyr"""
+    is_acc = np.tile(np.repeat([True, False], 3), 2)
+    norm_acc = 2 * (sensor_values - (-2.0)) / (2.0 - (-2.0)) - 1
+    norm_gyr = 2 * (sensor_values - (-500.0)) / (500.0 - (-500.0)) - 1
+    return np.clip(np.where(is_acc, norm_acc, norm_gyr), -1, 1)
+
+
+def recording_windows(features, size):
+    """Window ending at every sample, the first ones padded with zeros like the live buffer"""
+    padded = np.concatenate([np.zeros((size - 1, features.shape[1])), features])
+    # (n, 12, size) view -> (n, size, 12)
+    return sliding_window_view(padded, size, axis=0).transpose(0, 2, 1)
+
+
+def compile_dataset(out_dir=DATASET_DIR, sources=DEFAULT_SOURCES):
+    """
+    Packs every recording matched by sources into the store in out_dir.
+
+    Returns:
+        numpy.ndarray: The index, one row per recording.
+    """
+    recordings = []
+    for pattern, normalized in sources:
+        for path in glob.glob(pattern):
+            user = os.path.basename(os.path.dirname(path))
+            letter = os.path.splitext(os.path.basename(path))[0]
+            recordings.append((user, letter, normalized, path))
+    recordings.sort()
+
+    index = np.zeros(len(recordings), dtype=INDEX_DTYPE)
+    features, raw, timestamps = [], [], []
+    start = 0
+    for i, (user, letter, normalized, path) in enumerate(recordings):
+        sensor_values, recording_timestamps = load_recording(path)
+        features.append(sensor_values if normalized else normalize_rows(sensor_values))
+        raw.append(np.full_like(sensor_values, np.nan) if normalized else sensor_values)
+        timestamps.append(recording_timestamps)
+        index[i] = (user, letter, start, start + len(sensor_values), normalized)
+        start += len(sensor_values)
+
+    def stack(arrays, shape):
+        return np.concatenate(arrays) if arrays else np.empty(shape)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "features.npy"), stack(features, (0, N_FEATURES)).astype(np.float32))
+    np.save(os.path.join(out_dir, "raw.npy"), stack(raw, (0, N_FEATURES)).astype(np.float32))
+    np.save(os.path.join(out_dir, "timestamps.npy"), stack(timestamps, (0,)).astype(np.float64))
+    np.save(os.path.join(out_dir, "index.npy"), index)
+    with open(os.path.join(out_dir, "sources.json"), "w") as f:
+        json.dump([os.path.relpath(path, P2_DIR) for _, _, _, path in recordings], f, indent=1)
+    return index
+
+
+class GestureDataset:
+    """
+    Memory-mapped view of a compiled store.
+
+    Windows never cross recordings. window_view() is a zero-copy (N - w + 1, w, 12) view of
+    the whole store; window_starts() selects rows of it for any users and letters, so a
+    batch only copies the windows it gathers. windows() gathers a whole selection at once.
+
+    Usage:
+        dataset = GestureDataset()
+        X, y = dataset.windows(window_size=8, users=["user_1", "user_2"])   # (n, 8, 12), (n,)
+        view = dataset.window_view(8)
+        starts, labels = dataset.window_starts(8, stride=2, letters="abc")
+        batch = view[starts[:32]]
+    """
+
+    def __init__(self, path=DATASET_DIR):
+        if not os.path.exists(os.path.join(path, "index.npy")):
+            raise FileNotFoundError(f"No compiled dataset in {path}, run: python dataset.py")
+        self.path = path
+        self.index = np.load(os.path.join(path, "index.npy"))
+        self.features = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+        self.raw = np.load(os.path.join(path, "raw.npy"), mmap_mode="r")
+        self.timestamps = np.load(os.path.join(path, "timestamps.npy"), mmap_mode="r")
+
+    @property
+    def users(self):
+        return sorted(set(self.index["user"].tolist()))
+
+    @property
+    def letters(self):
+        return sorted(set(self.index["letter"].tolist()))
+
+    def select(self, users=None, letters=None):
+        # Index rows of the recordings of these users and letters, None for all
+        mask = np.ones(len(self.index), dtype=bool)
+        if users is not None:
+            mask &= np.isin(self.index["user"], list(users))
+        if letters is not None:
+            mask &= np.isin(self.index["letter"], list(letters))
+        return self.index[mask]
+
+    def recording(self, row, raw=False):
+        # (n, 12) values and (n,) timestamps of one index row, both views
+        values = self.raw if raw else self.features
+        return values[row["start"]:row["end"]], self.timestamps[row["start"]:row["end"]]
+
+    def window_view(self, window_size, raw=False):
+        values = self.raw if raw else self.features
+        n = max(len(values) - window_size + 1, 0)
+        row_stride, column_stride = values.strides
+        return as_strided(values, (n, window_size, values.shape[1]), (row_stride, row_stride, column_stride),
+                          writeable=False)
+
+    def window_starts(self, window_size, stride=1, users=None, letters=None):
+        """
+        Rows of window_view(window_size) for the selected recordings.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: (n,) window starts and (n,) letters.
+        """
+        rows = self.select(users, letters)
+        starts = [np.arange(row["start"], row["end"] - window_size + 1, stride) for row in rows]
+        lengths = [len(s) for s in starts]
+        starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        return starts, np.repeat(rows["letter"], lengths)
+
+    def windows(self, window_size=8, stride=1, users=None, letters=None, raw=False):
+        # (n, window_size, 12) windows and (n,) letters of the selection, gathered into memory
+        starts, labels = self.window_starts(window_size, stride, users, letters)
+        return self.window_view(window_size, raw)[starts], labels
+
+
+if __name__ == "__main__":
+    out_dir = sys.argv[1] if len(sys.argv) >= 2 else DATASET_DIR
+    start = time.perf_counter()
+    index = compile_dataset(out_dir)
+    print(f"Compiled {len(index)} recordings, {index['end'][-1] if len(index) else 0} samples "
+          f"into {out_dir} in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    dataset = GestureDataset(out_dir)
+    view = dataset.window_view(8)
+    starts, labels = dataset.window_starts(8)
+    load_time = time.perf_counter() - start
+    X, y = dataset.windows(8)
+    gather_time = time.perf_counter() - start - load_time
+    print(f"Loaded {len(starts)} windows of {len(dataset.users)} users in {load_time * 1000:.1f} ms "
+          f"(view), gathered {X.shape} in {gather_time * 1000:.1f} ms")
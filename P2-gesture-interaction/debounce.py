@@ -0,0 +1,155 @@
+import sys
+import time
+import numpy as np
+
+##############################################
+############# send debouncing ################
+##############################################
+
+# Labels of a hold group are sent once after `threshold` consecutive predictions and not
+# again while the last sent label is in the same group: noise (e, r), confirm (c), rotate (h, j).
+HOLD_GROUPS = [{'e', 'r'}, {'c'}, {'h', 'j'}]
+# Consecutive predictions needed before a label is sent, every other label needs DEFAULT_THRESHOLD.
+# A label that is not in a hold group is sent again on every prediction while it is held.
+THRESHOLDS = {'e': 1, 'r': 1, 'c': 3, 'h': 2, 'j': 2}
+DEFAULT_THRESHOLD = 2
+# live_keras.py predicts every PREDICTION_STRIDE samples, the thresholds count those predictions
+PREDICTION_STRIDE = 5
+
+
+class Debouncer:
+    """
+    Decides which predictions are sent, shared by live_keras.py and the offline tools.
+
+    push() takes one prediction at a time; run() takes a whole label sequence and gives the
+    same result as pushing every label, but only loops over runs of equal labels, so millions
+    of predictions take well under a second. Both continue from the current state.
+
+    Usage:
+        debouncer = Debouncer()
+        if debouncer.push(label, timestamp):
+            send(label)
+        sent_timestamps, sent_labels = Debouncer(thresholds={'c': 2}).run(labels, timestamps)
+    """
+
+    def __init__(self, thresholds=None, default_threshold=DEFAULT_THRESHOLD, hold_groups=HOLD_GROUPS):
+        self.thresholds = dict(THRESHOLDS if thresholds is None else {**THRESHOLDS, **thresholds})
+        self.default_threshold = default_threshold
+        self.hold_group = {label: frozenset(group) for group in hold_groups for label in group}
+        self.last_letter = None  # Last predicted label
+        self.last_sent = None  # Last actually sent label
+        self.last_sent_time = None
+        self.consecutive_count = 0
+
+    def threshold(self, label):
+        return self.thresholds.get(label, self.default_threshold)
+
+    def push(self, label, t=None):
+        # Returns True if this prediction is sent
+        if label == self.last_letter:
+            self.consecutive_count += 1
+        else:
+            self.last_letter = label
+            self.consecutive_count = 1
+
+        group = self.hold_group.get(label)
+        if group is not None:
+            send = self.last_sent not in group and self.consecutive_count == self.threshold(label)
+        elif self.last_sent != label:
+            send = self.consecutive_count == self.threshold(label)
+        else:
+            # stable, sent on every prediction
+            send = True
+
+        if send:
+            self.last_sent = label
+            self.last_sent_time = t
+            self.consecutive_count = 0
+        return send
+
+    def run(self, labels, timestamps=None):
+        """
+        push() over a whole sequence.
+
+        Args:
+            labels (array-like): Predicted labels in order.
+            timestamps (array-like, optional): Timestamp of every prediction, defaults to its index.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: Timestamps and labels of the sent predictions.
+        """
+        labels = np.asarray(labels)
+        timestamps = np.arange(len(labels)) if timestamps is None else np.asarray(timestamps)
+        if len(labels) == 0:
+            return timestamps[:0], labels[:0]
+
+        # runs of equal labels, the count restarts at every run start
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        lengths = np.diff(np.r_[starts, len(labels)])
+        run_labels = labels[starts].tolist()
+
+        first, last = [], [] # per run, positions [first, last) that are sent
+        count = self.consecutive_count if run_labels[0] == self.last_letter else 0
+        for label, start, length in zip(run_labels, starts.tolist(), lengths.tolist()):
+            group = self.hold_group.get(label)
+            # offset in the run where the count reaches the threshold
+            offset = self.threshold(label) - count - 1
+            sent = True
+            if group is not None:
+                sent = self.last_sent not in group and 0 <= offset < length
+                if sent:
+                    first.append(start + offset)
+                    last.append(start + offset + 1)
+                    count = length - offset - 1
+            elif self.last_sent == label:
+                first.append(start)
+                last.append(start + length)
+                count = 0
+            else:
+                sent = 0 <= offset < length
+                if sent:
+                    # every prediction after the first send is a stable one
+                    first.append(start + offset)
+                    last.append(start + length)
+                    count = 0
+            if sent:
+                self.last_sent = label
+                self.last_sent_time = timestamps[last[-1] - 1]
+            else:
+                count += length
+            next_count = count
+            count = 0
+
+        self.last_letter = run_labels[-1]
+        self.consecutive_count = next_count
+
+        # expand the [first, last) ranges to indices
+        first, last = np.array(first, dtype=np.int64), np.array(last, dtype=np.int64)
+        sizes = last - first
+        indices = np.repeat(first - np.r_[0, np.cumsum(sizes)[:-1]], sizes) + np.arange(sizes.sum())
+        return timestamps[indices], labels[indices]
+
+
+if __name__ == "__main__":
+    # push() and run() have to agree, then time run() on a long random sequence
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 1_000_000
+    rng = np.random.default_rng(0)
+    alphabet = np.array(list("abcdefhijklmnoprstvwxyz"))
+    # sticky sequence, like real predictions
+    labels = alphabet[np.cumsum(rng.random(n) < 0.3) % len(alphabet) * 7 % len(alphabet)]
+    labels[rng.random(n) < 0.05] = 'e'
+
+    for thresholds in (None, {'c': 2, 'a': 1}, {'e': 2, 'h': 3, 's': 4}):
+        check = labels[:50_000]
+        streaming = Debouncer(thresholds)
+        expected = [i for i, label in enumerate(check.tolist()) if streaming.push(label, i)]
+        batch = Debouncer(thresholds)
+        half = len(check) // 2
+        sent = np.r_[batch.run(check[:half])[0], batch.run(check[half:], np.arange(half, len(check)))[0]]
+        assert sent.tolist() == expected, thresholds
+        assert (batch.last_sent, batch.consecutive_count) == (streaming.last_sent, streaming.consecutive_count)
+    print("push and run agree")
+
+    start = time.perf_counter()
+    sent_timestamps, _ = Debouncer().run(labels)
+    print(f"run: {n} predictions, {len(sent_timestamps)} sent in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,111 @@
+import sys
+import json
+import pickle
+import numpy as np
+import tensorflow as tf
+
+from inference import model_paths, artifact_path
+from numpy_model import NumpyModel
+
+# Exports a trained .keras model and its label encoder to a NumPy weights archive
+# (models/<model_name>.npz) that numpy_model.NumpyModel runs without TensorFlow.
+#
+#   python export_model.py [model_name ...]
+
+model_name = 'a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978'
+
+# Only active during training, the forward pass skips them
+INFERENCE_NOOPS = {"InputLayer", "Dropout", "GaussianNoise"}
+
+
+def export_layer(layer):
+    # Layer description and weights for numpy_model, raises on anything the runtime does not implement
+    kind = type(layer).__name__
+    config = layer.get_config()
+    weights = layer.get_weights()
+
+    if kind == "Conv1D":
+        if (config["padding"] != "valid" or tuple(config["strides"]) != (1,) or tuple(config["dilation_rate"]) != (1,)
+                or config["groups"] != 1 or config["data_format"] != "channels_last"):
+            raise ValueError(f"{layer.name}: only valid, stride 1, channels_last Conv1D is supported")
+        return {"type": kind, "activation": config["activation"]}, {"kernel": weights[0], "bias": weights[1]}
+    if kind == "MaxPooling1D":
+        if config["padding"] != "valid" or tuple(config["strides"]) != tuple(config["pool_size"]):
+            raise ValueError(f"{layer.name}: only valid MaxPooling1D with strides == pool_size is supported")
+        return {"type": kind, "pool_size": int(config["pool_size"][0])}, {}
+    if kind == "BatchNormalization":
+        if config["axis"] not in (-1, [-1]) or not (config["center"] and config["scale"]):
+            raise ValueError(f"{layer.name}: only BatchNormalization over the last axis with center and scale is supported")
+        gamma, beta, mean, variance = weights
+        scale = gamma / np.sqrt(variance + config["epsilon"])
+        return {"type": kind}, {"scale": scale, "shift": beta - mean * scale}
+    if kind == "LSTM":
+        if config["return_sequences"] or config["go_backwards"] or not config["use_bias"]:
+            raise ValueError(f"{layer.name}: only forward LSTM returning the last state, with bias, is supported")
+        kernel, recurrent_kernel, bias = weights
+        return ({"type": kind, "activation": config["activation"], "recurrent_activation": config["recurrent_activation"]},
+                {"kernel": kernel, "recurrent_kernel": recurrent_kernel, "bias": bias})
+    if kind == "Dense":
+        if not config["use_bias"]:
+            raise ValueError(f"{layer.name}: Dense without bias is not supported")
+        return {"type": kind, "activation": config["activation"]}, {"kernel": weights[0], "bias": weights[1]}
+    if kind == "Flatten":
+        return {"type": kind}, {}
+    raise ValueError(f"{layer.name}: layer type {kind} is not supported by numpy_model")
+
+
+def write_artifact(model, classes, out_path, window_shape=None):
+    """
+    Writes a Keras model and its classes as a NumPy weights archive and checks that it
+    reproduces the model.
+
+    Args:
+        window_shape (tuple, optional): (window_size, n_features) windows for a model with a
+            flattened input, the artifact then flattens them itself.
+
+    Returns:
+        float: Largest absolute difference to the Keras probabilities.
+    """
+    layers, arrays = [], {}
+    if window_shape is not None:
+        layers.append({"type": "Flatten"})
+    for layer in model.layers:
+        if type(layer).__name__ in INFERENCE_NOOPS:
+            continue
+        description, weights = export_layer(layer)
+        for name, value in weights.items():
+            arrays[f"{len(layers)}/{name}"] = np.asarray(value, dtype=np.float32)
+        layers.append(description)
+
+    input_shape = tuple(window_shape or model.input_shape[1:])
+    np.savez(out_path,
+             layers=np.array(json.dumps(layers)),
+             input_shape=np.array(input_shape),
+             classes=np.asarray(classes),
+             **arrays)
+
+    # the artifact has to reproduce the Keras model
+    windows = np.random.default_rng(0).uniform(-1, 1, (256,) + input_shape).astype(np.float32)
+    reference = model(windows.reshape((256,) + tuple(model.input_shape[1:])), training=False).numpy()
+    exported = NumpyModel(out_path).predict_proba(windows)
+    max_diff = np.abs(reference - exported).max()
+    if max_diff > 1e-4:
+        raise ValueError(f"{out_path}: exported model differs from the Keras model by {max_diff:.2e}")
+    return max_diff
+
+
+def export_model(model_name):
+    model_path, label_encoder_path = model_paths(model_name)
+    model = tf.keras.models.load_model(model_path)
+    with open(label_encoder_path, 'rb') as f:
+        label_encoder = pickle.load(f)
+
+    out_path = artifact_path(model_name)
+    max_diff = write_artifact(model, label_encoder.classes_, out_path)
+    print(f"{model_name}: {len(NumpyModel(out_path).layers)} layers -> {out_path}, max abs diff {max_diff:.2e}")
+    return out_path
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or [model_name]:
+        export_model(name)
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+
+##############################################
+############# inference engine ###############
+##############################################
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+# name of the model live_keras.py loads, written by select_checkpoints.py
+CURRENT_MODEL_FILE = os.path.join(MODELS_DIR, "current_model.txt")
+
+
+def model_paths(model_name, models_dir=MODELS_DIR):
+    # .keras model and its label encoder, as saved by train_keras.ipynb
+    return (os.path.join(models_dir, f"{model_name}.keras"),
+            os.path.join(models_dir, f"label_encoder_{model_name}.pkl"))
+
+
+def artifact_path(model_name, models_dir=MODELS_DIR):
+    # NumPy weights archive written by export_model.py
+    return os.path.join(models_dir, f"{model_name}.npz")
+
+
+def current_model_name(default, path=CURRENT_MODEL_FILE):
+    # The model selected by select_checkpoints.py, or default if none was selected
+    if os.path.exists(path):
+        with open(path) as f:
+            name = f.read().strip()
+        if name:
+            return name
+    return default
+
+
+class InferenceEngine:
+    """
+    Keras gesture model behind a traced tf.function with a fixed input signature.
+
+    model.predict builds a dataset, a callback list and a progress bar on every call,
+    which costs far more than the forward pass of one (1, 8, 12) window. The traced
+    call runs the graph directly; the batch dimension is left open so single windows
+    and micro-batches share one trace.
+
+    Usage:
+        engine = InferenceEngine(model_path)
+        probabilities = engine.predict_proba(window)    # (8, 12) or (n, 8, 12)
+    """
+
+    def __init__(self, model_path, model=None):
+        # TensorFlow is only imported here, model_paths and the NumPy runtime work without it
+        import tensorflow as tf
+
+        self.model = model if model is not None else tf.keras.models.load_model(model_path)
+        self.input_shape = tuple(self.model.input_shape[1:])
+
+        model = self.model
+        @tf.function(input_signature=[tf.TensorSpec((None,) + self.input_shape, tf.float32)],
+                     reduce_retracing=True)
+        def forward(x):
+            return model(x, training=False)
+        self.forward = forward
+
+        # trace once now, not on the first live window
+        self.predict_proba(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+    def predict_proba(self, windows):
+        # Class probabilities of one window (window_size, n_features) or a batch of them
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == len(self.input_shape):
+            windows = windows[np.newaxis]
+        return self.forward(windows).numpy()
+
+
+class MicroBatcher:
+    """
+    Groups windows submitted from several threads (both hands, several sessions) into
+    one InferenceEngine call.
+
+    A worker thread takes the first pending window, collects whatever else arrives within
+    max_delay seconds up to max_batch windows, and runs them as one batch. submit() returns
+    a concurrent.futures.Future with the probabilities of that window.
+
+    Usage:
+        batcher = MicroBatcher(engine)
+        probabilities = batcher.submit(window).result()
+        batcher.close()
+    """
+
+    def __init__(self, engine, max_batch=16, max_delay=0.002):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, window):
+        future = Future()
+        self.pending.put((np.asarray(window, dtype=np.float32), future))
+        return future
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            batch = [item]
+            closing = False
+            try:
+                while len(batch) < self.max_batch:
+                    item = self.pending.get(timeout=self.max_delay)
+                    if item is None:
+                        closing = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            windows = np.stack([window for window, _ in batch])
+            try:
+                probabilities = self.engine.predict_proba(windows)
+                for (_, future), row in zip(batch, probabilities):
+                    future.set_result(row)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            if closing:
+                return
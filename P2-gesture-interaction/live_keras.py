@@ -1,13 +1,20 @@
-import serial
 import numpy as np
 import pickle
 import socket
-from collections import deque
-import tensorflow as tf
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import matplotlib as mpl
 import threading
+import asyncio
+import argparse
+import time
+import os
+from ring_buffer import RingBuffer
+from inference import InferenceEngine, model_paths, artifact_path, current_model_name
+from numpy_model import NumpyModel
+from debounce import Debouncer, PREDICTION_STRIDE
+from serial_reader import DualSerialReader
+from live_pipeline import LivePipeline
 
 
 
@@ -18,9 +25,8 @@ import threading
 ARDUINO_PORT_left = '/dev/cu.usbmodem13401'
 ARDUINO_PORT_right = '/dev/cu.usbmodem13201'
 
-# Open serial ports for both boards
-ser_left = serial.Serial(ARDUINO_PORT_left, 9600)
-ser_right = serial.Serial(ARDUINO_PORT_right, 9600)
+# "binary" for arduino_stream.ino with BINARY_STREAM 1 (115200 baud), "ascii" for CSV lines (9600 baud)
+SERIAL_PROTOCOL = "binary"
 
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
@@ -29,17 +35,14 @@ sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 ##############################################
 ### load model and label encoder #############
 ##############################################
-window_size = 8
-buffer = deque(maxlen=window_size)
-buffer_lock = threading.Lock()
+buffer_capacity = 64
+# Starts with 0s (12 features for combined data from both boards). Written by the
+# processing thread only, the plot reads it through buffer.snapshot
+buffer = RingBuffer(buffer_capacity, 12)
 
-# Fill buffer with 0s (12 features for combined data from both boards)
-for _ in range(window_size):
-    buffer.append(np.zeros(12))
-
-model_name = 'a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978'
-model_path = f'/Users/ziru/Documents/GitHub/CMIS_1/P2-gesture-interaction/models/{model_name}.keras'
-label_encoder_path = f'/Users/ziru/Documents/GitHub/CMIS_1/P2-gesture-interaction/models/label_encoder_{model_name}.pkl'
+# models/current_model.txt when select_checkpoints.py picked one
+model_name = current_model_name('a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978')
+model_path, label_encoder_path = model_paths(model_name)
 
 prediction_to_key = {
     'a': 'A', # leftleft moveStep * 2.5
@@ -85,10 +88,19 @@ last_prediction = None
 last_sent_prediction = None  
 consecutive_predictions = 0 
 
-model = tf.keras.models.load_model(model_path)
-with open(label_encoder_path, 'rb') as f:
-    label_encoder = pickle.load(f)
-print("loaded everything")
+if os.path.exists(artifact_path(model_name)):
+    # exported by export_model.py, runs on NumPy and starts without importing TensorFlow
+    engine = NumpyModel(artifact_path(model_name))
+    classes = engine.classes
+else:
+    # traced forward pass instead of model.predict, see inference.py
+    engine = InferenceEngine(model_path)
+    with open(label_encoder_path, 'rb') as f:
+        label_encoder = pickle.load(f)
+    classes = label_encoder.classes_
+# the model takes (window_size, 12) windows
+window_size = engine.input_shape[0]
+print(f"loaded {model_name}, windows of {window_size}")
 
 
 ##############################################
@@ -122,10 +134,11 @@ ax.set_ylim(-1, 1)
 prediction_text = ax.text(0.02, 0.95, "Prediction: None", transform=ax.transAxes, 
                          fontsize=12, fontweight='bold', color='#FF4444')
 
+plot_window = np.zeros((window_size, 12), dtype=np.float32)
+
 def animate(frame):
     """更新图表"""
-    with buffer_lock:
-        data_array = np.array(buffer)
+    data_array = buffer.snapshot(window_size, out=plot_window)
     for i in range(12):
         lines[i].set_ydata(data_array[:, i])
     
@@ -140,116 +153,43 @@ def animate(frame):
 ##############################################
 ############ data processing ################
 ##############################################
-last_letter = None     
-last_sent = None       
-consecutive_count = 0   
+debouncer = Debouncer()
 
 def data_processing_thread():
-    global last_letter, last_sent, consecutive_count, last_prediction
+    global last_prediction
     count = 0
-    while True:
+    # frame: L-Acc, L-Gyr, R-Acc, R-Gyr in raw sensor units
+    for timestamp, frame in reader.frames():
         try:
-            line_left = ser_left.readline().decode('utf-8', errors='ignore').strip()
-            line_right = ser_right.readline().decode('utf-8', errors='ignore').strip()
-            
-            processed_left = process_data(line_left, "LEFT")
-            processed_right = process_data(line_right, "RIGHT")
-            
-            if processed_left is None or processed_right is None:
-                continue
-
-            acc_left, gyr_left = processed_left
-            acc_right, gyr_right = processed_right
-            combined = np.concatenate([acc_left, gyr_left, acc_right, gyr_right])
-
-            with buffer_lock:
-                buffer.append(combined)
+            combined = normalize_frame(frame)
+
+            buffer.append(combined)
                 
             count += 1
 
-            if count % 5 == 0:
-                with buffer_lock:
-                    prediction_input = np.array(buffer).reshape(1, window_size, 12)
+            if count % PREDICTION_STRIDE == 0:
+                # view of the latest window, no copy, this thread is the only writer
+                prediction_input = buffer.window(window_size)[np.newaxis]
                 
-                raw_prediction = model.predict(prediction_input, verbose=0)
+                raw_prediction = engine.predict_proba(prediction_input)
                 prediction_index = np.argmax(raw_prediction)
-                prediction = label_encoder.inverse_transform([prediction_index])
-                current_pred = prediction[0]
+                current_pred = classes[prediction_index]
                 last_prediction = current_pred
 
-                if current_pred == last_letter:
-                    consecutive_count += 1
-                else:
-                    last_letter = current_pred
-                    consecutive_count = 1
-
-                send = False
-
-                if current_pred in {'e', 'r'}:
-                    if consecutive_count == 1 and last_sent not in {'e', 'r'}:
-                        send = True
-                elif current_pred == 'c':
-                    if last_sent != 'c' and consecutive_count == 3:
-                        send = True
-                elif current_pred in {'h', 'j'}:
-                    if last_sent not in {'h', 'j'} and consecutive_count == 2:
-                        send = True
-                else:
-                    if last_sent != current_pred:
-                        if consecutive_count == 2:
-                            send = True
-                    else:
-                        if consecutive_count >= 1:
-                            send = True
+                # consecutive count / last sent rules, see debounce.py
+                send = debouncer.push(current_pred, time.time())
 
                 if send:
-                    last_sent = current_pred
                     print(f"Combined Prediction: {current_pred}")
                     if current_pred in prediction_to_key:
                         key = prediction_to_key[current_pred]
                         sock.sendto(key.encode("utf-8"), (UDP_IP, UDP_PORT))
                     else:
                         print(f"Warning: No mapping for prediction '{current_pred}'")
-                    consecutive_count = 0
 
         except Exception as e:
             print(f"Error in data processing thread: {e}")
 
-def process_data(line, side):
-    if not line:
-        return None
-    try:
-        line_clean = line.replace(";", ",")
-        parts = line_clean.split(',')
-        values = []
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            for prefix in ["ACC:", "GYR:"]:
-                if part.startswith(prefix):
-                    part = part.replace(prefix, "")
-            try:
-                values.append(float(part))
-            except Exception as e:
-                print(f"[{side}] cannot transf: {part}")
-                raise e
-                
-        if len(values) != 6:
-            print(f"[{side}] length error: {len(values)}")
-            return None
-            
-        acc_values = np.array(values[:3], dtype=np.float32)
-        gyr_values = np.array(values[3:], dtype=np.float32)
-
-        acc_values, gyr_values = normalize(acc_values, gyr_values)
-        
-        return acc_values, gyr_values
-        
-    except Exception as e:
-        print(f"[{side}] error processing: {str(e)}")
-        return None
-    
 ############### normalization ################
 def normalize(acc_values, gyr_values):
     ACC_MIN, ACC_MAX = -2.0, 2.0  
@@ -263,27 +203,77 @@ def normalize(acc_values, gyr_values):
     
     return norm_acc, norm_gyr
 
+def normalize_frame(frame):
+    # frame: L-Acc, L-Gyr, R-Acc, R-Gyr in raw sensor units
+    acc_left, gyr_left = normalize(frame[0:3], frame[3:6])
+    acc_right, gyr_right = normalize(frame[6:9], frame[9:12])
+    return np.concatenate([acc_left, gyr_left, acc_right, gyr_right])
+
 ##############################################
 ############### mainnn #######################
 ##############################################
 
-def main():
+def run_threads(plot=True):
+    global reader
+    # One reader thread per board, samples are paired by receipt time
+    reader = DualSerialReader(ARDUINO_PORT_left, ARDUINO_PORT_right, protocol=SERIAL_PROTOCOL)
     try:
+        reader.start()
         thread = threading.Thread(target=data_processing_thread, daemon=True)
         thread.start()
         
-        ani = animation.FuncAnimation(fig, animate, interval=20, blit=True)
-        plt.show()
+        if plot:
+            ani = animation.FuncAnimation(fig, animate, interval=20, blit=True)
+            plt.show()
+        else:
+            thread.join()
         
     except KeyboardInterrupt:
         print("interrupted")
     except Exception as e:
         print(f"mainerror: {str(e)}")
     finally:
-        ser_left.close()
-        ser_right.close()
+        reader.close()
+        print(reader.stats())
+        sock.close()
+        print("exited")
+
+def run_asyncio(plot=True):
+    # Same stages on one event loop, see live_pipeline.py
+    pipeline = LivePipeline(engine, classes, normalize_frame, prediction_to_key, buffer, debouncer,
+                            window_size=window_size, stride=PREDICTION_STRIDE, udp_address=(UDP_IP, UDP_PORT))
+
+    def draw():
+        global last_prediction
+        if not plt.fignum_exists(fig.number):
+            return False
+        last_prediction = pipeline.last_prediction
+        animate(None)
+        fig.canvas.draw_idle()
+        fig.canvas.flush_events()
+
+    if plot:
+        plt.ion()
+        plt.show(block=False)
+    try:
+        asyncio.run(pipeline.run(ARDUINO_PORT_left, ARDUINO_PORT_right, protocol=SERIAL_PROTOCOL,
+                                 draw=draw if plot else None))
+    except KeyboardInterrupt:
+        print("interrupted")
+    finally:
+        print(pipeline.stats())
         sock.close()
         print("exited")
 
+def main():
+    parser = argparse.ArgumentParser(description="Predict gestures live and send them to UI.pde.")
+    parser.add_argument("--asyncio", action="store_true", help="run the asyncio pipeline instead of the reader threads")
+    parser.add_argument("--no-plot", action="store_true", help="no live plot of the sensor data")
+    args = parser.parse_args()
+    if args.asyncio:
+        run_asyncio(plot=not args.no_plot)
+    else:
+        run_threads(plot=not args.no_plot)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,253 @@
+import time
+import asyncio
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from serial_reader import SampleDecoder, TimestampJoiner, parse_line
+
+##############################################
+########### asyncio live pipeline ############
+##############################################
+
+# serial -> join -> window -> inference -> debounce -> UDP, connected by bounded asyncio
+# queues. When a stage falls behind, its input queue fills up and the stage before it waits
+# on put(). At the front each board pauses its transport once high_water decoded samples
+# wait for the join stage, which resumes it below low_water, so further samples wait in the
+# OS buffer. Python holds at most high_water samples plus one read per board, and none are
+# dropped to make room. Everything except the forward pass (thread pool) runs on the event
+# loop thread, the optional plot included, so no plot thread competes with inference for
+# the GIL.
+
+
+class SerialSampleProtocol(asyncio.Protocol):
+    """
+    Decodes the bytes of one board into a deque of (receipt time, values). Reading pauses
+    when high_water samples are waiting, resume_if_drained() continues below low_water.
+    """
+
+    def __init__(self, name, on_samples, protocol="ascii", parse=parse_line, high_water=128, low_water=32):
+        self.name = name
+        self.on_samples = on_samples
+        self.decoder = SampleDecoder(protocol, parse)
+        self.samples = deque()
+        self.high_water = high_water
+        self.low_water = low_water
+        self.transport = None
+        self.connected = False
+        self.paused = False
+        self.pauses = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.connected = True
+
+    def data_received(self, data):
+        receipt_time = time.time()
+        samples = self.decoder.feed(data)
+        self.samples.extend((receipt_time, values) for values in samples)
+        if len(self.samples) >= self.high_water and not self.paused:
+            # the join stage is behind, or the other board stalled
+            self.transport.pause_reading()
+            self.paused = True
+            self.pauses += 1
+        if len(samples):
+            self.on_samples()
+
+    def resume_if_drained(self):
+        if self.paused and self.connected and len(self.samples) <= self.low_water:
+            self.transport.resume_reading()
+            self.paused = False
+
+    def connection_lost(self, exc):
+        if exc is not None:
+            print(f"[{self.name}] connection lost: {exc}")
+        self.connected = False
+        self.on_samples()
+
+
+async def open_serial(source, protocol_factory, baudrate):
+    # pyserial configures the port, asyncio reads its file descriptor as a character
+    # device (POSIX only). source can also be any pipe-like object with fileno()
+    if isinstance(source, str):
+        import serial
+        source = serial.Serial(source, baudrate, timeout=0)
+    loop = asyncio.get_running_loop()
+    try:
+        _, protocol = await loop.connect_read_pipe(protocol_factory, source)
+    except BaseException:
+        source.close()
+        raise
+    return protocol
+
+
+class LivePipeline:
+    """
+    Live prediction as asyncio stages, the event-loop counterpart of the reader thread in
+    live_keras.py with the same windowing, stride and send rules.
+
+    Usage:
+        pipeline = LivePipeline(engine, classes, normalize_frame, prediction_to_key,
+                                RingBuffer(64, 12), Debouncer())
+        asyncio.run(pipeline.run(ARDUINO_PORT_left, ARDUINO_PORT_right, protocol="binary"))
+        print(pipeline.stats())
+    """
+
+    def __init__(self, engine, classes, normalize_frame, prediction_to_key, buffer, debouncer,
+                 window_size=8, stride=5, udp_address=("127.0.0.1", 5005), queue_size=32,
+                 max_skew=0.1, skew_warning=0.03):
+        self.engine = engine
+        self.classes = classes
+        self.normalize_frame = normalize_frame
+        self.prediction_to_key = prediction_to_key
+        self.buffer = buffer
+        self.debouncer = debouncer
+        self.window_size = window_size
+        self.stride = stride
+        self.udp_address = udp_address
+        self.queue_size = queue_size
+        self.max_skew = max_skew
+        self.skew_warning = skew_warning
+        self.last_prediction = None
+        # set by run(), empty until the boards are open
+        self.ports = []
+        self.joiner = None
+        # counters
+        self.frames_full = 0  # waits of the join stage on the window stage
+        self.sent = 0
+        self.latencies = deque(maxlen=10_000)  # frame receipt to debounced prediction, seconds
+
+    ############### stages ################
+
+    def samples_received(self):
+        self.samples_ready.set()
+
+    def resume_drained(self):
+        for port in self.ports:
+            port.resume_if_drained()
+
+    async def join_stage(self):
+        while True:
+            await self.samples_ready.wait()
+            self.samples_ready.clear()
+            while (frame := self.joiner.join_next()) is not None:
+                if self.frames.full():
+                    # the boards keep reading until their high water mark, then pause
+                    self.frames_full += 1
+                    await self.frames.put(frame)
+                else:
+                    self.frames.put_nowait(frame)
+                self.resume_drained()
+            self.resume_drained()
+            if not all(port.connected for port in self.ports):
+                await self.frames.put(None)
+                return
+
+    async def window_stage(self):
+        count = 0
+        while (item := await self.frames.get()) is not None:
+            timestamp, frame = item
+            self.buffer.append(self.normalize_frame(frame))
+            count += 1
+            if count % self.stride == 0:
+                # copy, the buffer moves on while the window waits for the engine
+                await self.windows.put((timestamp, self.buffer.window(self.window_size).copy()))
+        await self.windows.put(None)
+
+    async def inference_stage(self):
+        loop = asyncio.get_running_loop()
+        while (item := await self.windows.get()) is not None:
+            timestamp, window = item
+            probabilities = await loop.run_in_executor(self.executor, self.engine.predict_proba, window[np.newaxis])
+            await self.predictions.put((timestamp, self.classes[int(np.argmax(probabilities))]))
+        await self.predictions.put(None)
+
+    async def send_stage(self, udp):
+        while (item := await self.predictions.get()) is not None:
+            timestamp, label = item
+            self.last_prediction = label
+            # consecutive count / last sent rules, see debounce.py
+            if self.debouncer.push(label, timestamp):
+                print(f"Combined Prediction: {label}")
+                if label in self.prediction_to_key:
+                    # one command per datagram, UI.pde reads each packet as one command
+                    udp.sendto(self.prediction_to_key[label].encode("utf-8"))
+                    self.sent += 1
+                else:
+                    print(f"Warning: No mapping for prediction '{label}'")
+            self.latencies.append(time.time() - timestamp)
+
+    async def plot_stage(self, draw, interval):
+        # draw() updates and flushes the figure, returning False when it was closed
+        while draw() is not False:
+            await asyncio.sleep(interval)
+        self.stop()
+
+    def stop(self):
+        # Closing the boards ends the join stage, the rest drains and finishes after it
+        for port in self.ports:
+            if port.transport is not None:
+                port.transport.close()
+
+    ############### run ################
+
+    async def run(self, left, right, protocol="ascii", baudrate=None, draw=None, draw_interval=0.05):
+        """
+        Runs until a board disconnects, the plot is closed, a stage fails or the task is cancelled.
+
+        Args:
+            left, right: Serial port names, or pipe-like objects with fileno().
+            protocol (str): "ascii" or "binary", see serial_reader.SampleDecoder.
+            baudrate (int, optional): Defaults to the rate of the protocol.
+            draw (callable, optional): Redraws the plot on the event loop thread.
+        """
+        self.samples_ready = asyncio.Event()
+        self.frames = asyncio.Queue(self.queue_size)
+        # a window waiting for the engine is already late, keep this one short
+        self.windows = asyncio.Queue(2)
+        self.predictions = asyncio.Queue(self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+        baudrate = baudrate or SampleDecoder(protocol).baudrate
+        self.ports = []
+        self.joiner = None
+        udp = None
+        tasks = []
+        try:
+            # opened inside the try, so a port that fails to open still closes the ones before it
+            for name, source in (("left", left), ("right", right)):
+                self.ports.append(await open_serial(
+                    source, lambda name=name: SerialSampleProtocol(name, self.samples_received, protocol), baudrate))
+            self.joiner = TimestampJoiner(self.ports[0].samples, self.ports[1].samples, self.max_skew, self.skew_warning)
+            loop = asyncio.get_running_loop()
+            udp, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=self.udp_address)
+
+            stages = [self.join_stage(), self.window_stage(), self.inference_stage(), self.send_stage(udp)]
+            if draw is not None:
+                stages.append(self.plot_stage(draw, draw_interval))
+            tasks = [asyncio.create_task(stage) for stage in stages]
+            # every stage ends once a board disconnected and the queues drained, a failing
+            # stage ends the pipeline right away
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.stop()
+            if udp is not None:
+                udp.close()
+            self.executor.shutdown(wait=False)
+
+    def stats(self):
+        # Also safe before run() or after it failed to open the boards, with the counters it has
+        latencies = np.array(self.latencies)
+        return {
+            **(self.joiner.stats() if self.joiner is not None else {}),
+            **{key: value for port in self.ports for key, value in port.decoder.stats(port.name).items()},
+            **{f"pauses_{port.name}": port.pauses for port in self.ports},
+            "frames_full": self.frames_full,
+            "sent": self.sent,
+            "latency_mean": float(latencies.mean()) if len(latencies) else float("nan"),
+            "latency_p95": float(np.percentile(latencies, 95)) if len(latencies) else float("nan"),
+        }
@@ -0,0 +1,107 @@
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+##############################################
+########## NumPy forward pass ################
+##############################################
+
+# Runtime for the .npz artifacts written by export_model.py. Only needs NumPy, so
+# live prediction starts without importing TensorFlow or scikit-learn.
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "softmax": lambda x: softmax(x),
+}
+
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def conv1d(x, kernel, bias, activation):
+    # "valid" padding, stride 1. x (n, steps, in), kernel (width, in, out)
+    width = kernel.shape[0]
+    patches = sliding_window_view(x, width, axis=1) # (n, steps - width + 1, in, width)
+    return ACTIVATIONS[activation](np.einsum("nsiw,wio->nso", patches, kernel) + bias)
+
+
+def max_pooling1d(x, pool_size):
+    # "valid" padding, strides == pool_size
+    steps = x.shape[1] // pool_size * pool_size
+    return x[:, :steps].reshape(x.shape[0], -1, pool_size, x.shape[2]).max(axis=2)
+
+
+def lstm(x, kernel, recurrent_kernel, bias, activation, recurrent_activation):
+    # Keras gate order i, f, c, o; returns the last hidden state
+    units = recurrent_kernel.shape[0]
+    act, rec_act = ACTIVATIONS[activation], ACTIVATIONS[recurrent_activation]
+    inputs = x @ kernel + bias # all timesteps at once, (n, steps, 4 * units)
+    h = np.zeros((x.shape[0], units), dtype=x.dtype)
+    c = np.zeros((x.shape[0], units), dtype=x.dtype)
+    for t in range(x.shape[1]):
+        z = inputs[:, t] + h @ recurrent_kernel
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units:2 * units])
+        g = act(z[:, 2 * units:3 * units])
+        o = rec_act(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+    return h
+
+
+class NumpyModel:
+    """
+    Gesture model exported by export_model.py, evaluated with NumPy only.
+
+    The archive holds the layer list as JSON, the weights of every layer as "<index>/<name>"
+    and the label encoder classes, so predictions decode without the pickle.
+
+    Usage:
+        model = NumpyModel(artifact_path(model_name))
+        probabilities = model.predict_proba(window)   # (8, 12) or (n, 8, 12)
+        labels = model.classes[np.argmax(probabilities, axis=1)]
+    """
+
+    def __init__(self, path):
+        with np.load(path) as archive:
+            self.layers = json.loads(str(archive["layers"]))
+            self.input_shape = tuple(int(v) for v in archive["input_shape"])
+            self.classes = archive["classes"]
+            self.weights = [
+                {name.split("/", 1)[1]: archive[name] for name in archive.files if name.startswith(f"{i}/")}
+                for i in range(len(self.layers))
+            ]
+
+    def predict_proba(self, windows):
+        # Class probabilities of one window or a batch of them
+        x = np.asarray(windows, dtype=np.float32)
+        if x.ndim == len(self.input_shape):
+            x = x[np.newaxis]
+        for layer, weights in zip(self.layers, self.weights):
+            kind = layer["type"]
+            if kind == "Conv1D":
+                x = conv1d(x, weights["kernel"], weights["bias"], layer["activation"])
+            elif kind == "MaxPooling1D":
+                x = max_pooling1d(x, layer["pool_size"])
+            elif kind == "BatchNormalization":
+                # folded into one scale and shift at export
+                x = x * weights["scale"] + weights["shift"]
+            elif kind == "LSTM":
+                x = lstm(x, weights["kernel"], weights["recurrent_kernel"], weights["bias"],
+                         layer["activation"], layer["recurrent_activation"])
+            elif kind == "Dense":
+                x = ACTIVATIONS[layer["activation"]](x @ weights["kernel"] + weights["bias"])
+            elif kind == "Flatten":
+                x = x.reshape(x.shape[0], -1)
+            else:
+                raise ValueError(f"unsupported layer in artifact: {kind}")
+        return x
+
+    def predict(self, windows):
+        # Labels of one window or a batch of them
+        return self.classes[np.argmax(self.predict_proba(windows), axis=-1)]
@@ -0,0 +1,180 @@
+import os
+import sys
+import glob
+import time
+import pickle
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dataset import GestureDataset, DATASET_DIR
+from inference import MODELS_DIR
+
+# Cross-user evaluation of every model in models/ and every epoch in checkpoints/. Each model
+# is scored on the recordings of every user on its own, so a model that only works for the
+# user it was trained on shows up as one good column, and acc_worst is the accuracy on the
+# hardest held-out user. One model per worker process.
+#
+#   python dataset.py                                     # compile the recordings first
+#   python offlinetest/evaluate_models.py --out evaluation
+
+P2_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CHECKPOINTS_DIR = os.path.join(P2_DIR, "checkpoints")
+
+
+def model_classes(model_path, n_outputs, corpus_letters):
+    """
+    Labels of the model outputs: its label encoder from train_keras.ipynb, or for the
+    checkpoints, which are saved without one, the sorted corpus letters if they match.
+
+    Returns:
+        tuple[numpy.ndarray, str]: Classes and where they came from.
+    """
+    folder, file_name = os.path.split(model_path)
+    for encoder_path in (os.path.join(folder, f"label_encoder_{os.path.splitext(file_name)[0]}.pkl"),
+                         os.path.join(folder, "label_encoder.pkl")):
+        if os.path.exists(encoder_path):
+            with open(encoder_path, 'rb') as f:
+                return np.asarray(pickle.load(f).classes_), "label encoder"
+    if len(corpus_letters) == n_outputs:
+        return np.asarray(corpus_letters), "corpus letters"
+    raise ValueError(f"no label encoder and {n_outputs} outputs for {len(corpus_letters)} letters")
+
+
+def measure_latency(engine, window, repeats):
+    # Median seconds of one single-window call, after a warm-up call
+    engine.predict_proba(window)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        engine.predict_proba(window)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def init_worker():
+    # one thread per worker, the pool is the parallelism
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def evaluate_model(model_path, dataset_dir, users, stride, latency_repeats):
+    """
+    Scores one model on every user.
+
+    Returns:
+        dict: Accuracy and coverage per user, latency, and the confusion matrix summed
+        over users (rows: true class, columns: predicted class, in model class order).
+    """
+    from inference import InferenceEngine
+
+    dataset = GestureDataset(dataset_dir)
+    engine = InferenceEngine(model_path)
+    # (w, 12) windows, or the flattened (w * 12,) input of the Dense checkpoints
+    flat = len(engine.input_shape) == 1
+    window_size = engine.input_shape[0] // 12 if flat else engine.input_shape[0]
+    n_outputs = engine.model.output_shape[-1]
+    classes, classes_source = model_classes(model_path, n_outputs, dataset.letters)
+
+    view = dataset.window_view(window_size)
+    confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    result = {"model": os.path.relpath(model_path, P2_DIR), "window_size": window_size,
+              "n_classes": len(classes), "classes_from": classes_source}
+    for user in users:
+        starts, labels = dataset.window_starts(window_size, stride, users=[user])
+        known = np.isin(labels, classes)
+        result[f"coverage_{user}"] = float(known.mean()) if len(labels) else float("nan")
+        starts, labels = starts[known], labels[known]
+        if len(starts) == 0:
+            result[f"acc_{user}"] = float("nan")
+            continue
+        windows = view[starts]
+        if flat:
+            windows = windows.reshape(len(windows), -1)
+        predicted = np.concatenate([engine.predict_proba(windows[i:i + 4096]).argmax(axis=1)
+                                    for i in range(0, len(windows), 4096)])
+        true = np.searchsorted(classes, labels)
+        result[f"acc_{user}"] = float(np.mean(predicted == true))
+        np.add.at(confusion, (true, predicted), 1)
+
+    window = np.zeros((1,) + engine.input_shape, dtype=np.float32)
+    result["latency_ms"] = measure_latency(engine, window, latency_repeats) * 1000
+    batch = np.zeros((256,) + engine.input_shape, dtype=np.float32)
+    result["batch_us_per_window"] = measure_latency(engine, batch, max(latency_repeats // 10, 3)) / 256 * 1e6
+    return result, classes, confusion
+
+
+def top_confusions(classes, confusion, k=3):
+    # "true>predicted share" of the k most frequent errors, share of the true class windows
+    errors = confusion.astype(np.float64)
+    np.fill_diagonal(errors, 0)
+    totals = np.maximum(confusion.sum(axis=1, keepdims=True), 1)
+    rates = errors / totals
+    order = np.argsort(rates, axis=None)[::-1][:k]
+    pairs = [np.unravel_index(i, rates.shape) for i in order]
+    return " ".join(f"{classes[t]}>{classes[p]} {rates[t, p]:.0%}" for t, p in pairs if rates[t, p] > 0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate every model on the recordings of every user.")
+    parser.add_argument("--models", nargs="*", default=None, help="model files, default models/*.keras and checkpoints/*.keras")
+    parser.add_argument("--users", nargs="*", default=None, help="default every user_* in the dataset")
+    parser.add_argument("--dataset", default=DATASET_DIR, help="compiled by dataset.py")
+    parser.add_argument("--stride", type=int, default=1, help="evaluate every n-th window")
+    parser.add_argument("--latency-repeats", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count(), 8))
+    parser.add_argument("--out", default=None, help="folder for the table and the confusion matrices")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_files = args.models or (sorted(glob.glob(os.path.join(MODELS_DIR, "*.keras")))
+                                  + sorted(glob.glob(os.path.join(CHECKPOINTS_DIR, "*.keras"))))
+    dataset = GestureDataset(args.dataset)
+    users = args.users or [user for user in dataset.users if user.startswith("user_")]
+    print(f"Evaluating {len(model_files)} models on {', '.join(users)}")
+
+    start = time.perf_counter()
+    rows, matrices = [], {}
+    # TensorFlow does not survive fork, start the workers fresh
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker) as pool:
+        futures = {pool.submit(evaluate_model, path, args.dataset, users, args.stride, args.latency_repeats): path
+                   for path in model_files}
+        for future in as_completed(futures):
+            try:
+                result, classes, confusion = future.result()
+            except Exception as e:
+                # still listed, with the reason it could not be scored
+                rows.append({"model": os.path.relpath(futures[future], P2_DIR), "error": str(e)})
+                continue
+            accuracies = [result[f"acc_{user}"] for user in users]
+            result["acc_mean"] = float(np.nanmean(accuracies)) if not np.all(np.isnan(accuracies)) else float("nan")
+            result["acc_worst"] = float(np.nanmin(accuracies)) if not np.all(np.isnan(accuracies)) else float("nan")
+            result["top_confusions"] = top_confusions(classes, confusion)
+            rows.append(result)
+            matrices[result["model"]] = (classes, confusion)
+    print(f"Evaluated in {time.perf_counter() - start:.1f}s")
+
+    columns = (["model", "acc_mean", "acc_worst"] + [f"acc_{user}" for user in users]
+               + ["latency_ms", "batch_us_per_window", "n_classes", "window_size", "classes_from", "top_confusions"]
+               + [f"coverage_{user}" for user in users] + ["error"])
+    table = (pd.DataFrame(rows, columns=columns).sort_values(["acc_mean", "model"], ascending=[False, True])
+             .reset_index(drop=True))
+    table[["n_classes", "window_size"]] = table[["n_classes", "window_size"]].astype("Int64")
+    with pd.option_context("display.width", 250, "display.max_colwidth", 60, "display.float_format", "{:.3f}".format):
+        shown = table[[c for c in columns if not c.startswith("coverage_")]]
+        print(shown.astype(object).where(shown.notna(), "").to_string(index=False))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        table.to_csv(os.path.join(args.out, "evaluation.csv"), index=False)
+        for model, (classes, confusion) in matrices.items():
+            name = os.path.splitext(os.path.basename(model))[0]
+            pd.DataFrame(confusion, index=classes, columns=classes).to_csv(os.path.join(args.out, f"confusion_{name}.csv"))
+        print(f"Table and confusion matrices written to {args.out}")
@@ -0,0 +1,138 @@
+import os
+import sys
+import glob
+import time
+import pickle
+import hashlib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from inference import InferenceEngine, model_paths, artifact_path, current_model_name
+from numpy_model import NumpyModel
+from dataset import load_recording, normalize_rows, recording_windows
+
+# Softmax output of the window ending at every sample of a recording, stored as .npy and
+# read back memory-mapped. Entries are keyed by the model file hash, the window size and the
+# recording hash, so a retrained model or an edited recording never reads a stale entry.
+# Only a cache miss builds the model, the window size of a model is cached with its entries.
+#
+#   python offlinetest/probability_cache.py [recording.csv ...]    # fill the cache
+
+P2_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# the model of live_keras.py
+DEFAULT_MODEL_NAME = current_model_name('a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978')
+CACHE_DIR = os.path.join(P2_DIR, ".cache", "probabilities")
+# processed_data is already normalized to [-1, 1]
+DEFAULT_RECORDINGS = [
+    (os.path.join(P2_DIR, "data", "**", "*.csv"), False),
+    (os.path.join(P2_DIR, "processed_data", "*.csv"), True),
+]
+
+
+def file_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def load_engine(model_path):
+    # NumPy artifact or Keras model, whichever model_path is
+    return NumpyModel(model_path) if model_path.endswith(".npz") else InferenceEngine(model_path)
+
+
+def save_atomic(path, array):
+    # write then rename, a reader never maps a half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class ProbabilityCache:
+    """
+    Per-window probabilities of one model over recorded sessions.
+
+    Usage:
+        cache = ProbabilityCache()
+        timestamps, probabilities = cache.get("data/user_1/a.csv")   # memory-mapped
+        labels = cache.classes()[np.argmax(probabilities, axis=1)]
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, window_size=None, cache_dir=CACHE_DIR):
+        self.model_path, self.label_encoder_path = model_paths(model_name)
+        # like live_keras.py, the NumPy artifact when there is one (select_checkpoints.py only writes that)
+        if os.path.exists(artifact_path(model_name)):
+            self.model_path = artifact_path(model_name)
+        self.model_hash = file_hash(self.model_path)
+        self.model_dir = os.path.join(cache_dir, self.model_hash[:16])
+        self.engine = None
+        if window_size is None:
+            window_size = self.model_window_size()
+        self.window_size = window_size
+        self.dir = os.path.join(self.model_dir, f"window_{window_size}")
+
+    def model_window_size(self):
+        # Window size of the model, its input shape is cached so a hit never builds the engine
+        path = os.path.join(self.model_dir, "input_shape.npy")
+        if not os.path.exists(path):
+            self.engine = load_engine(self.model_path)
+            os.makedirs(self.model_dir, exist_ok=True)
+            save_atomic(path, np.asarray(self.engine.input_shape))
+        input_shape = np.load(path)
+        # flattened windows, 12 values per sample
+        return int(input_shape[0]) if len(input_shape) == 2 else int(input_shape[0]) // 12
+
+    def classes(self):
+        # Label of every probability column, the label encoder is only unpickled once
+        path = os.path.join(self.dir, "classes.npy")
+        if not os.path.exists(path):
+            with open(self.label_encoder_path, 'rb') as f:
+                label_encoder = pickle.load(f)
+            os.makedirs(self.dir, exist_ok=True)
+            save_atomic(path, np.asarray(label_encoder.classes_))
+        return np.load(path)
+
+    def entry_paths(self, recording_path, normalized=False):
+        key = file_hash(recording_path)[:32] + ("_normalized" if normalized else "")
+        return (os.path.join(self.dir, f"{key}_probabilities.npy"),
+                os.path.join(self.dir, f"{key}_timestamps.npy"))
+
+    def get(self, recording_path, normalized=False):
+        """
+        Timestamps and probabilities of every sample of a recording, computed on a miss.
+
+        Args:
+            recording_path (str): CSV with 12 sensor values and a timestamp per line.
+            normalized (bool): The sensor values are already in [-1, 1], e.g. processed_data.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: (n,) timestamps and (n, n_classes) probabilities,
+            both read-only memory maps.
+        """
+        probabilities_path, timestamps_path = self.entry_paths(recording_path, normalized)
+        if not (os.path.exists(probabilities_path) and os.path.exists(timestamps_path)):
+            sensor_values, timestamps = load_recording(recording_path)
+            features = sensor_values if normalized else normalize_rows(sensor_values)
+            if self.engine is None:
+                self.engine = load_engine(self.model_path)
+            windows = recording_windows(features, self.window_size)
+            probabilities = self.engine.predict_proba(windows.reshape((len(windows),) + self.engine.input_shape))
+            os.makedirs(self.dir, exist_ok=True)
+            save_atomic(timestamps_path, timestamps)
+            save_atomic(probabilities_path, probabilities.astype(np.float32))
+        return np.load(timestamps_path, mmap_mode="r"), np.load(probabilities_path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2:
+        recordings = [(path, "processed_data" in path) for path in sys.argv[1:]]
+    else:
+        recordings = [(path, normalized) for pattern, normalized in DEFAULT_RECORDINGS
+                      for path in sorted(glob.glob(pattern, recursive=True))]
+
+    cache = ProbabilityCache()
+    cache.classes()
+    start = time.perf_counter()
+    n_windows = 0
+    for path, normalized in recordings:
+        timestamps, probabilities = cache.get(path, normalized)
+        n_windows += len(probabilities)
+    print(f"{len(recordings)} recordings, {n_windows} windows cached in {cache.dir} ({time.perf_counter() - start:.2f}s)")
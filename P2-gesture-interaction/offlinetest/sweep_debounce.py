@@ -0,0 +1,126 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from debounce import Debouncer, THRESHOLDS, DEFAULT_THRESHOLD, PREDICTION_STRIDE
+from probability_cache import ProbabilityCache
+
+# Offline sweep of the prediction stride and the debounce thresholds over the recorded
+# sessions. Every recording under data/user_* holds one gesture, named by its file, so a
+# send of any other label is a false send. The probabilities of the window at every sample
+# come from probability_cache.py; each setting then only slices the labels and runs the Debouncer.
+#
+#   python offlinetest/sweep_debounce.py --strides 1 3 5 8 --workers 8 --out sweep.csv
+
+P2_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEFAULT_DATA = os.path.join(P2_DIR, "data", "user_*", "*.csv")
+
+
+def recording_labels(paths, cache):
+    """
+    Label of the window ending at every sample of every recording, from the probability cache.
+
+    Returns:
+        list[tuple[str, numpy.ndarray, numpy.ndarray]]: Per recording the gesture it holds,
+        the timestamps and the predicted labels, both with one entry per sample.
+    """
+    classes = cache.classes()
+    recordings = []
+    for path in paths:
+        timestamps, probabilities = cache.get(path)
+        if len(timestamps) == 0:
+            continue
+        labels = classes[np.argmax(probabilities, axis=1)]
+        recordings.append((os.path.splitext(os.path.basename(path))[0], np.array(timestamps), labels))
+    return recordings
+
+
+def evaluate(recordings, stride, thresholds, default_threshold):
+    # Metrics of one setting over all recordings
+    sends, false_sends, latencies, missed = 0, 0, [], 0
+    for gesture, timestamps, labels in recordings:
+        sent_timestamps, sent_labels = Debouncer(thresholds, default_threshold).run(labels[::stride], timestamps[::stride])
+        correct = sent_labels == gesture
+        sends += len(sent_labels)
+        false_sends += int(np.sum(~correct))
+        if correct.any():
+            # time from the start of the recording to the first correct send
+            latencies.append(sent_timestamps[correct][0] - timestamps[0])
+        else:
+            missed += 1
+    return {
+        "sends": sends,
+        "false_send_rate": false_sends / sends if sends else 0.0,
+        "mean_latency": float(np.mean(latencies)) if latencies else float("nan"),
+        "median_latency": float(np.median(latencies)) if latencies else float("nan"),
+        "missed_rate": missed / len(recordings),
+    }
+
+
+# recordings are sent to every worker once, not with every setting
+worker_recordings = None
+
+def init_worker(recordings):
+    global worker_recordings
+    worker_recordings = recordings
+
+def evaluate_setting(setting):
+    stride, default_threshold, confirm, rotate, noise = setting
+    thresholds = {'c': confirm, 'h': rotate, 'j': rotate, 'e': noise, 'r': noise}
+    return {
+        "stride": stride, "default": default_threshold, "confirm": confirm, "rotate": rotate, "noise": noise,
+        **evaluate(worker_recordings, stride, thresholds, default_threshold)
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep prediction stride and debounce thresholds over recorded sessions.")
+    parser.add_argument("patterns", nargs="*", default=[DEFAULT_DATA], help="recordings, one gesture per file named by its label")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 3, 5, 8], help="predict every n samples")
+    parser.add_argument("--default", type=int, nargs="+", default=[1, DEFAULT_THRESHOLD, 3], help="threshold of the direction/size labels")
+    parser.add_argument("--confirm", type=int, nargs="+", default=[2, 3, 4], help="threshold of c")
+    parser.add_argument("--rotate", type=int, nargs="+", default=[1, 2, 3], help="threshold of h and j")
+    parser.add_argument("--noise", type=int, nargs="+", default=[1, 2], help="threshold of e and r")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=None, help="write all results as CSV")
+    parser.add_argument("--top", type=int, default=10, help="settings to print")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = sorted({path for pattern in args.patterns for path in glob.glob(pattern)})
+    if not paths:
+        print(f"No recordings match: {' '.join(args.patterns)}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    recordings = recording_labels(paths, ProbabilityCache())
+    print(f"Loaded {sum(len(labels) for _, _, labels in recordings)} windows of {len(recordings)} recordings "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    settings = list(itertools.product(args.strides, args.default, args.confirm, args.rotate, args.noise))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(recordings,)) as pool:
+        results = pd.DataFrame(pool.map(evaluate_setting, settings, chunksize=max(1, len(settings) // (4 * args.workers))))
+    print(f"Evaluated {len(settings)} settings in {time.perf_counter() - start:.2f}s")
+
+    results = results.sort_values(["false_send_rate", "mean_latency"]).reset_index(drop=True)
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"Results written to {args.out}")
+    with pd.option_context("display.width", 160, "display.float_format", "{:.3f}".format):
+        print(results.head(args.top).to_string(index=False))
+        current = results[(results["stride"] == PREDICTION_STRIDE) & (results["default"] == DEFAULT_THRESHOLD)
+                          & (results["confirm"] == THRESHOLDS['c']) & (results["rotate"] == THRESHOLDS['h'])
+                          & (results["noise"] == THRESHOLDS['e'])]
+        if len(current):
+            print("\ncurrent live setting:")
+            print(current.to_string(index=False))
@@ -1,6 +1,5 @@
 import numpy as np
 import pickle
-import tensorflow as tf
 from collections import deque
 import os
 import sys
@@ -17,6 +16,11 @@ import numpy as np
 import matplotlib.patches as mpatches
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from inference import InferenceEngine, model_paths
+from debounce import Debouncer, PREDICTION_STRIDE
+from dataset import load_recording, normalize_rows, recording_windows
+
 # Gesture to symbol mapping
 gesture_symbols = {
     'a': '⬅️⬅️',  # leftleft
@@ -145,9 +149,8 @@ def visualize_predictions_and_sent(predictions_file, sent_file, output_image='ti
 window_size = 8
 model_name = 'a_b_c_d_e_f_h_i_j_k_l_m_n_o_p_r_s_t_v_w_x_y_z__1742260240_264978'
 
-# Attempt to find model paths (from original code)
-model_path = f'/Users/ziru/Documents/GitHub/CMIS_1/P2-gesture-interaction/models/{model_name}.keras'
-label_encoder_path = f'/Users/ziru/Documents/GitHub/CMIS_1/P2-gesture-interaction/models/label_encoder_{model_name}.pkl'
+# Model paths in P2-gesture-interaction/models
+model_path, label_encoder_path = model_paths(model_name)
 
 # Mapping of predictions to keys (from original code)
 prediction_to_key = {
@@ -163,7 +166,8 @@ def load_model_and_encoder():
     print(f"Loading label encoder from {label_encoder_path}")
     
     try:
-        model = tf.keras.models.load_model(model_path)
+        # traced forward pass instead of model.predict, see inference.py
+        model = InferenceEngine(model_path)
         with open(label_encoder_path, 'rb') as f:
             label_encoder = pickle.load(f)
         print("Model and label encoder loaded successfully")
@@ -233,9 +237,7 @@ def predict_from_file(input_file, prediction_output_file, sent_output_file):
         buffer.append(np.zeros(12))
     
     # Initialize tracking variables
-    last_letter = None         # Last predicted character
-    last_sent = None           # Last actually sent character
-    consecutive_count = 0      # Consecutive count
+    debouncer = Debouncer()
     
     # Lists to store results
     all_predictions = []
@@ -284,7 +286,7 @@ def predict_from_file(input_file, prediction_output_file, sent_output_file):
             prediction_input = np.array(buffer).reshape(1, window_size, 12)
             
             # Make prediction
-            raw_prediction = model.predict(prediction_input, verbose=0)
+            raw_prediction = model.predict_proba(prediction_input)
             prediction_index = np.argmax(raw_prediction)
             prediction = label_encoder.inverse_transform([prediction_index])
             current_pred = prediction[0]
@@ -293,42 +295,11 @@ def predict_from_file(input_file, prediction_output_file, sent_output_file):
             all_predictions.append((timestamp, current_pred))
             print(f"Sample {i+1}: Predicted '{current_pred}' at time {timestamp}")
             
-            # Update consecutive count
-            if current_pred == last_letter:
-                consecutive_count += 1
-            else:
-                last_letter = current_pred
-                consecutive_count = 1
-            
-            send = False
-
-            if current_pred in {'e', 'r'}:
-                # noise
-                if consecutive_count == 1 and last_sent not in {'e', 'r'}:
-                    send = True
-            elif current_pred == 'c':
-                # confirming
-                if last_sent != 'c' and consecutive_count == 3:
-                    send = True
-            elif current_pred in {'h', 'j'}:
-                # rotating
-                if last_sent not in {'h', 'j'} and consecutive_count == 2:
-                    send = True
-            else:
-                # new
-                if last_sent != current_pred:
-                    if consecutive_count == 2:
-                        send = True
-                else:
-                    # stable
-                    if consecutive_count >= 1:
-                        send = True
-
-
+            # consecutive count / last sent rules, see debounce.py
+            send = debouncer.push(current_pred, timestamp)
             
             # If we should "send" this prediction, record it
             if send:
-                last_sent = current_pred
                 print(f"  -> Sending prediction: {current_pred}")
                 
                 if current_pred in prediction_to_key:
@@ -336,10 +307,16 @@ def predict_from_file(input_file, prediction_output_file, sent_output_file):
                     all_sent.append((timestamp, current_pred, key))
                 else:
                     print(f"Warning: No mapping for prediction '{current_pred}'")
-                
-                # Reset consecutive count after sending
-                consecutive_count = 0
     
+    write_results(all_predictions, all_sent, prediction_output_file, sent_output_file)
+    
+    print(f"Processed {len(data_lines)} samples")
+    print(f"Made {len(all_predictions)} predictions")
+    print(f"Sent {len(all_sent)} keys")
+    print(f"Results written to {prediction_output_file} and {sent_output_file}")
+
+def write_results(all_predictions, all_sent, prediction_output_file, sent_output_file):
+    """Write the predictions and sent files"""
     # Write predictions to file
     with open(prediction_output_file, 'w') as f:
         f.write("timestamp,prediction\n")
@@ -351,8 +328,56 @@ def predict_from_file(input_file, prediction_output_file, sent_output_file):
         f.write("timestamp,prediction,key\n")
         for timestamp, pred, key in all_sent:
             f.write(f"{timestamp},{pred},{key}\n")
-    
-    print(f"Processed {len(data_lines)} samples")
+
+##############################################
+########### vectorized replay ################
+##############################################
+
+def sent_from_predictions(all_predictions, debouncer=None):
+    """Sent (timestamp, prediction, key) for a sequence of (timestamp, prediction)"""
+    if debouncer is None:
+        debouncer = Debouncer()
+    if not all_predictions:
+        return []
+    timestamps, labels = zip(*all_predictions)
+    sent_timestamps, sent_labels = debouncer.run(np.array(labels), np.array(timestamps))
+    all_sent = []
+    for timestamp, pred in zip(sent_timestamps.tolist(), sent_labels.tolist()):
+        if pred in prediction_to_key:
+            all_sent.append((timestamp, pred, prediction_to_key[pred]))
+        else:
+            print(f"Warning: No mapping for prediction '{pred}'")
+    return all_sent
+
+def replay_from_file(input_file, prediction_output_file, sent_output_file, model=None, label_encoder=None):
+    """
+    Vectorized predict_from_file: loads the whole recording, builds every window with
+    sliding_window_view and classifies them in one batched call. Writes the same files.
+    """
+    if model is None:
+        model, label_encoder = load_model_and_encoder()
+
+    sensor_values, timestamps = load_recording(input_file)
+    print(f"Read {len(sensor_values)} data lines from {input_file}")
+
+    # If we have very few samples, repeat them to fill the buffer
+    if len(sensor_values) < window_size:
+        repeat_count = window_size // len(sensor_values) + 1
+        sensor_values = np.tile(sensor_values, (repeat_count, 1))
+        timestamps = np.tile(timestamps, repeat_count)
+
+    # short recordings predict at every sample
+    stride = PREDICTION_STRIDE if len(sensor_values) >= 10 else 1
+    windows = recording_windows(normalize_rows(sensor_values), window_size)[::stride]
+
+    raw_predictions = model.predict_proba(windows)
+    labels = label_encoder.inverse_transform(np.argmax(raw_predictions, axis=1))
+    all_predictions = list(zip(timestamps[::stride].tolist(), labels.tolist()))
+    all_sent = sent_from_predictions(all_predictions)
+
+    write_results(all_predictions, all_sent, prediction_output_file, sent_output_file)
+
+    print(f"Processed {len(sensor_values)} samples")
     print(f"Made {len(all_predictions)} predictions")
     print(f"Sent {len(all_sent)} keys")
     print(f"Results written to {prediction_output_file} and {sent_output_file}")
@@ -369,7 +394,8 @@ if __name__ == "__main__":
     
     # Track execution time
     start_time = time.time()
-    predict_from_file(input_file, prediction_output_file, sent_output_file)
+    # predict_from_file replays sample by sample like the live loop, same output
+    replay_from_file(input_file, prediction_output_file, sent_output_file)
     elapsed_time = time.time() - start_time
     print(f"Execution completed in {elapsed_time:.2f} seconds")
     predictions_file = 'P2-gesture-interaction/offlinetest/predictions.csv'
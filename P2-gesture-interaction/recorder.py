@@ -0,0 +1,198 @@
+import os
+import sys
+import glob
+import time
+import queue
+import threading
+import numpy as np
+
+##############################################
+############ recording writer ################
+##############################################
+
+# collect.py hands every frame to a writer thread through a queue and never touches a file.
+# The writer fills a preallocated block and writes it as one .npy segment when it is full,
+# when a recording stops, or at least every checkpoint_interval seconds. Every segment is
+# fsynced and renamed into place, so a crash loses at most the last checkpoint_interval.
+#
+#   data/<timestamp>/segments/<letter>/000000.npy    (n, 13): 12 sensor values, timestamp
+#
+# convert_recordings() turns the segments into the per-letter CSVs the notebooks read:
+#
+#   python recorder.py data/<timestamp>
+
+COLUMNS = [
+    'L-AccX', 'L-AccY', 'L-AccZ',
+    'L-GyrX', 'L-GyrY', 'L-GyrZ',
+    'R-AccX', 'R-AccY', 'R-AccZ',
+    'R-GyrX', 'R-GyrY', 'R-GyrZ',
+    'timestamp']
+
+
+def fsync_dir(path):
+    # makes a rename durable, not available on Windows
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class RecordingWriter(threading.Thread):
+    """
+    Writes recorded frames as .npy segments on its own thread.
+
+    write() only puts the frame on a queue.SimpleQueue, a C queue without Python-level
+    locking, so the serial reader never waits on the disk.
+
+    Usage:
+        recorder = RecordingWriter(data_folder_path)
+        recorder.start()
+        recorder.start_recording('a')
+        recorder.write(timestamp, frame)        # from the reader thread
+        recorder.stop_recording()
+        recorder.close()
+        convert_recordings(data_folder_path)
+    """
+
+    def __init__(self, folder, n_features=12, block_size=1024, checkpoint_interval=1.0):
+        super().__init__(name="recorder", daemon=True)
+        self.folder = folder
+        self.queue = queue.SimpleQueue()
+        self.block = np.empty((block_size, n_features + 1), dtype=np.float64)
+        self.checkpoint_interval = checkpoint_interval
+        self.active = False  # only read by write(), the writer follows the queue order
+        self.letter = None
+        self.rows = 0  # rows of the block in use
+        self.segment = 0
+        self.last_checkpoint = time.monotonic()
+        # counters
+        self.frames_written = 0
+        self.segments_written = 0
+
+    ############### any thread ################
+
+    def start_recording(self, letter):
+        self.queue.put(("start", letter))
+        self.active = True
+
+    def stop_recording(self):
+        self.active = False
+        self.queue.put(("stop", None))
+
+    def write(self, timestamp, frame):
+        if self.active:
+            self.queue.put((timestamp, frame))
+
+    def close(self):
+        self.active = False
+        self.queue.put(("close", None))
+        self.join()
+
+    ############### writer thread ################
+
+    def segment_dir(self, letter):
+        return os.path.join(self.folder, "segments", letter)
+
+    def checkpoint(self):
+        # Write the rows of the block as the next segment
+        self.last_checkpoint = time.monotonic()
+        if self.rows == 0:
+            return
+        folder = self.segment_dir(self.letter)
+        path = os.path.join(folder, f"{self.segment:06d}.npy")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, self.block[:self.rows])
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        fsync_dir(folder)
+        self.frames_written += self.rows
+        self.segments_written += 1
+        self.segment += 1
+        self.rows = 0
+
+    def begin(self, letter):
+        self.checkpoint()
+        # a new take replaces the old one, like reopening the CSV with "w" did
+        folder = self.segment_dir(letter)
+        os.makedirs(folder, exist_ok=True)
+        for path in glob.glob(os.path.join(folder, "*.npy*")):
+            os.remove(path)
+        self.letter = letter
+        self.segment = 0
+
+    def end(self):
+        self.checkpoint()
+        self.letter = None
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.checkpoint_interval)
+            except queue.Empty:
+                item = None
+            # drain whatever else is queued before looking at the clock
+            while item is not None:
+                head, payload = item
+                if isinstance(head, str):
+                    if head == "start":
+                        self.begin(payload)
+                    elif head == "stop":
+                        self.end()
+                    else:
+                        self.end()
+                        return
+                elif self.letter is not None:
+                    row = self.block[self.rows]
+                    row[:-1] = payload
+                    row[-1] = head
+                    self.rows += 1
+                    if self.rows == len(self.block):
+                        self.checkpoint()
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if self.letter is not None and time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+
+
+def load_segments(folder):
+    # All rows of one letter in recording order, (n, 13)
+    paths = sorted(glob.glob(os.path.join(folder, "*.npy")))
+    if not paths:
+        return np.empty((0, len(COLUMNS)))
+    return np.concatenate([np.load(path) for path in paths])
+
+
+def convert_recordings(folder):
+    """
+    Writes <folder>/<letter>.csv for every letter under <folder>/segments, in the format
+    collect.py used to write directly: float32 sensor values and the receipt timestamp.
+
+    Returns:
+        list[str]: Paths of the written CSVs.
+    """
+    written = []
+    for letter_dir in sorted(glob.glob(os.path.join(folder, "segments", "*"))):
+        rows = load_segments(letter_dir)
+        values, timestamps = rows[:, :-1].astype(np.float32), rows[:, -1]
+        path = os.path.join(folder, f"{os.path.basename(letter_dir)}.csv")
+        with open(path, "w") as file:
+            file.write(",".join(COLUMNS) + "\n")
+            for row, timestamp in zip(values, timestamps.tolist()):
+                file.write(",".join(map(str, row)) + f",{timestamp}\n")
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python recorder.py data/<timestamp> [...]")
+        sys.exit(1)
+    for folder in sys.argv[1:]:
+        for path in convert_recordings(folder):
+            print(f"Wrote {path}")
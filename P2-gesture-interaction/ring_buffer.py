@@ -0,0 +1,59 @@
+import time
+import numpy as np
+
+##############################################
+########### sensor ring buffer ###############
+##############################################
+
+class RingBuffer:
+    """
+    Preallocated ring buffer of sensor samples, shape (capacity, n_features).
+
+    Every sample is written twice, at i and i + capacity, so the latest `size` samples are
+    always one contiguous slice and window() never copies. One thread writes; readers on
+    other threads take a consistent copy with snapshot(), which retries while a write is
+    in progress (seqlock: the sequence number is odd during a write).
+
+    Usage:
+        buffer = RingBuffer(capacity=64)
+        buffer.append(sample)                 # writer thread
+        window = buffer.window(8)             # writer thread, view of the latest 8 samples
+        plot_data = buffer.snapshot(8, out)   # any thread, copy into out
+    """
+
+    def __init__(self, capacity, n_features=12, dtype=np.float32):
+        self.capacity = capacity
+        self.n_features = n_features
+        self.data = np.zeros((2 * capacity, n_features), dtype=dtype)
+        self.count = 0 # samples written so far
+        self.sequence = 0 # odd while a write is in progress
+
+    def append(self, sample):
+        # Single writer only
+        i = self.count % self.capacity
+        self.sequence += 1
+        self.data[i] = sample
+        self.data[i + self.capacity] = sample
+        self.count += 1
+        self.sequence += 1
+
+    def window(self, size):
+        # View of the latest `size` samples, oldest first. Before `size` samples arrived
+        # the window starts with zeros. Only valid on the writer thread until the next append.
+        if size > self.capacity:
+            raise ValueError(f"window of {size} samples does not fit a capacity of {self.capacity}")
+        end = self.count % self.capacity + self.capacity
+        return self.data[end - size:end]
+
+    def snapshot(self, size, out=None):
+        # Consistent copy of the latest `size` samples for reader threads
+        if out is None:
+            out = np.empty((size, self.n_features), dtype=self.data.dtype)
+        while True:
+            sequence = self.sequence
+            if sequence % 2:
+                time.sleep(0) # let the writer finish
+                continue
+            np.copyto(out, self.window(size))
+            if self.sequence == sequence:
+                return out
@@ -0,0 +1,200 @@
+import os
+import re
+import glob
+import time
+import pickle
+import argparse
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.preprocessing import LabelEncoder
+
+from dataset import GestureDataset, DATASET_DIR
+from inference import CURRENT_MODEL_FILE, model_paths, artifact_path
+
+# Picks the model to run live from the epochs in checkpoints/. Every checkpoint is scored on
+# held-out users in a process pool, the top-k are kept, optionally their weights averaged
+# (SWA), and the result written as one NumPy artifact with its label encoder in models/.
+# models/current_model.txt then names it, and live_keras.py loads it from there.
+#
+#   python dataset.py                                        # compile the recordings first
+#   python select_checkpoints.py --top-k 5 --swa
+#   python select_checkpoints.py --top-k 5 --prune           # also delete the other epochs
+#
+# Pruning only runs once the export succeeded, and not after the SWA-below-best warning
+# unless --force is given, so the epochs to export instead are still there.
+#
+# A checkpoints folder can hold several training runs. Checkpoints are grouped by their weight
+# shapes, and only the run whose outputs match the classes is scored.
+
+P2_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINTS_DIR = os.path.join(P2_DIR, "checkpoints")
+
+
+def epoch_of(path):
+    match = re.search(r"(\d+)\.keras$", path)
+    return int(match.group(1)) if match else -1
+
+
+def window_shape(input_shape, n_features=12):
+    # (window_size, 12) windows of a model, whose input may be a flattened window
+    return tuple(input_shape) if len(input_shape) == 2 else (input_shape[0] // n_features, n_features)
+
+
+def init_worker():
+    # one thread per worker, the pool is the parallelism
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def holdout_windows(dataset, shape, users, classes, stride):
+    # Held-out windows of the known letters, shaped for the model input, and their labels
+    starts, labels = dataset.window_starts(shape[0], stride, users, letters=classes)
+    windows = dataset.window_view(shape[0])[starts]
+    return windows, np.searchsorted(classes, labels)
+
+
+def score(model, windows, y):
+    # Accuracy and mean cross-entropy of a Keras model on windows
+    flat = windows.reshape((len(windows),) + tuple(model.input_shape[1:]))
+    probabilities = np.concatenate([model(flat[i:i + 4096], training=False).numpy()
+                                    for i in range(0, len(flat), 4096)])
+    accuracy = float(np.mean(probabilities.argmax(axis=1) == y))
+    loss = float(-np.mean(np.log(np.clip(probabilities[np.arange(len(y)), y], 1e-7, 1))))
+    return accuracy, loss
+
+
+def score_checkpoint(path, dataset_dir, users, classes, stride):
+    """
+    Scores one checkpoint on the held-out users.
+
+    Returns:
+        dict: Weight shapes of the checkpoint, and accuracy and loss when its outputs match classes.
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(path)
+    result = {"path": path, "epoch": epoch_of(path),
+              "signature": (tuple(model.input_shape[1:]),) + tuple(w.shape for w in model.get_weights())}
+    if model.output_shape[-1] != len(classes):
+        return result
+    windows, y = holdout_windows(GestureDataset(dataset_dir), window_shape(model.input_shape[1:]), users, classes, stride)
+    result["accuracy"], result["loss"] = score(model, windows, y)
+    return result
+
+
+def average_weights(paths):
+    """
+    Averages the weights of checkpoints of one run (stochastic weight averaging).
+    BatchNormalization statistics are averaged like the other weights.
+
+    Returns:
+        keras.Model: The first checkpoint with the averaged weights.
+    """
+    import tensorflow as tf
+
+    models = [tf.keras.models.load_model(path) for path in paths]
+    averaged = [np.mean(weights, axis=0) for weights in zip(*(model.get_weights() for model in models))]
+    models[0].set_weights(averaged)
+    return models[0]
+
+
+def load_classes(label_encoder_path, dataset):
+    # Classes of the checkpoints: their label encoder, or the sorted letters of the dataset
+    if label_encoder_path and os.path.exists(label_encoder_path):
+        with open(label_encoder_path, 'rb') as f:
+            return np.asarray(pickle.load(f).classes_), "label encoder"
+    return np.asarray(dataset.letters), "dataset letters"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Select the best checkpoints and export them for live_keras.py.")
+    parser.add_argument("--checkpoints", default=CHECKPOINTS_DIR)
+    parser.add_argument("--label-encoder", default=os.path.join(CHECKPOINTS_DIR, "label_encoder.pkl"),
+                        help="classes of the checkpoints, default the sorted letters of the dataset")
+    parser.add_argument("--dataset", default=DATASET_DIR, help="compiled by dataset.py")
+    parser.add_argument("--holdout", nargs="*", default=None, help="held-out users, default every user_* in the dataset")
+    parser.add_argument("--stride", type=int, default=1, help="score every n-th window")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--swa", action="store_true", help="export the average of the top-k instead of the best")
+    parser.add_argument("--prune", action="store_true", help="delete the scored checkpoints outside the top-k")
+    parser.add_argument("--force", action="store_true", help="prune even when the SWA scores below the best epoch")
+    parser.add_argument("--name", default=None, help="model name in models/, default from the classes and epochs")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count(), 8))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    dataset = GestureDataset(args.dataset)
+    classes, classes_source = load_classes(args.label_encoder, dataset)
+    users = args.holdout or [user for user in dataset.users if user.startswith("user_")]
+    paths = sorted(glob.glob(os.path.join(args.checkpoints, "*.keras")), key=epoch_of)
+    print(f"Scoring {len(paths)} checkpoints on {', '.join(users)}, {len(classes)} classes from the {classes_source}")
+
+    start = time.perf_counter()
+    # TensorFlow does not survive fork, start the workers fresh
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker) as pool:
+        futures = [pool.submit(score_checkpoint, path, args.dataset, users, classes, args.stride) for path in paths]
+        results = [future.result() for future in futures]
+    print(f"Scored in {time.perf_counter() - start:.1f}s")
+
+    scored = [r for r in results if "accuracy" in r]
+    skipped = [r for r in results if "accuracy" not in r]
+    if skipped:
+        print(f"Skipped {len(skipped)} checkpoints with other outputs: epochs {', '.join(str(r['epoch']) for r in skipped)}")
+    if not scored:
+        raise SystemExit(f"No checkpoint has {len(classes)} outputs")
+    # the best run decides, in case several runs share the output size
+    scored.sort(key=lambda r: (-r["accuracy"], r["loss"]))
+    run = [r for r in scored if r["signature"] == scored[0]["signature"]]
+    top = run[:args.top_k]
+    for r in run:
+        print(f"{'*' if r in top else ' '} epoch {r['epoch']:3d}  accuracy {r['accuracy']:.3f}  loss {r['loss']:.3f}")
+
+    import tensorflow as tf
+
+    epochs = [r["epoch"] for r in top]
+    swa_below_best = False
+    if args.swa and len(top) > 1:
+        model = average_weights([r["path"] for r in top])
+        windows, y = holdout_windows(dataset, window_shape(model.input_shape[1:]), users, classes, args.stride)
+        accuracy, loss = score(model, windows, y)
+        print(f"SWA of epochs {', '.join(map(str, sorted(epochs)))}: accuracy {accuracy:.4f}  loss {loss:.3f} "
+              f"(best epoch {top[0]['accuracy']:.4f})")
+        swa_below_best = accuracy < top[0]["accuracy"]
+        if swa_below_best:
+            print("Warning: the average scores below the best epoch, consider exporting without --swa")
+        tag = "swa_" + "_".join(map(str, sorted(epochs)))
+    else:
+        model = tf.keras.models.load_model(top[0]["path"])
+        tag = f"epoch_{top[0]['epoch']}"
+
+    # one artifact and its label encoder, named like the models of train_keras.ipynb
+    name = args.name or f"{'_'.join(classes)}__{tag}"
+    shape = window_shape(model.input_shape[1:])
+    from export_model import write_artifact
+    max_diff = write_artifact(model, classes, artifact_path(name), shape if len(model.input_shape) == 2 else None)
+    _, label_encoder_path = model_paths(name)
+    label_encoder = LabelEncoder().fit(classes)
+    with open(label_encoder_path, 'wb') as f:
+        pickle.dump(label_encoder, f)
+    # write then rename, live_keras.py never reads a half written name
+    tmp_path = f"{CURRENT_MODEL_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(name + "\n")
+    os.replace(tmp_path, CURRENT_MODEL_FILE)
+    print(f"Wrote {os.path.relpath(artifact_path(name), P2_DIR)} ({os.path.getsize(artifact_path(name)) / 1024:.0f} KiB, "
+          f"windows of {shape[0]}, max abs diff {max_diff:.2e}) and its label encoder, "
+          f"live_keras.py loads it from {os.path.relpath(CURRENT_MODEL_FILE, P2_DIR)}")
+
+    if args.prune and swa_below_best and not args.force:
+        print("Not pruning, the average scores below the best epoch, use --force to prune anyway")
+    elif args.prune:
+        pruned = [r["path"] for r in run if r not in top]
+        freed = sum(os.path.getsize(path) for path in pruned)
+        for path in pruned:
+            os.remove(path)
+        print(f"Pruned {len(pruned)} checkpoints, {freed / 2 ** 20:.1f} MiB freed")
@@ -0,0 +1,132 @@
+import sys
+import time
+import struct
+import binascii
+import numpy as np
+
+##############################################
+########### binary sensor frames #############
+##############################################
+
+# Frame sent by arduino_stream.ino with BINARY_STREAM 1, little-endian, 30 bytes:
+#   sync 0xA5 0x5A | uint16 sequence | 6 x float32 aX,aY,aZ,gX,gY,gZ | uint16 CRC
+# The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over the sequence and the values.
+SYNC = b"\xa5\x5a"
+FRAME_DTYPE = np.dtype([("sync", "<u2"), ("seq", "<u2"), ("values", "<f4", (6,)), ("crc", "<u2")])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+SYNC_WORD = struct.unpack("<H", SYNC)[0]
+BINARY_BAUDRATE = 115200
+ASCII_BAUDRATE = 9600
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(seq, values):
+    # Same bytes as the board sends, for replaying recordings and checking the decoder
+    body = struct.pack("<H6f", seq & 0xFFFF, *values)
+    return SYNC + body + struct.pack("<H", crc16(body))
+
+
+class FrameDecoder:
+    """
+    Decodes a byte stream of binary frames, whatever chunks it arrives in.
+
+    Runs of aligned frames are read with one np.frombuffer call; only the CRC is checked
+    per frame. After a bad sync word or CRC the decoder searches for the next sync bytes,
+    so a partial frame at the start of the stream or a corrupted byte costs one frame.
+
+    Usage:
+        decoder = FrameDecoder()
+        seqs, values = decoder.feed(ser.read(ser.in_waiting or 1))   # (n,), (n, 6) float32
+    """
+
+    def __init__(self):
+        self.pending = b""
+        self.last_seq = None
+        # counters
+        self.frames = 0
+        self.crc_errors = 0
+        self.skipped_bytes = 0
+        self.lost = 0  # frames missing according to the sequence numbers
+
+    def feed(self, data):
+        data = self.pending + bytes(data)
+        accepted = []
+        pos = 0
+        while True:
+            start = data.find(SYNC, pos)
+            if start < 0:
+                # the last byte may be the first half of a sync word
+                end = max(pos, len(data) - 1)
+                self.skipped_bytes += end - pos
+                pos = end
+                break
+            self.skipped_bytes += start - pos
+            n = (len(data) - start) // FRAME_SIZE
+            if n == 0:
+                pos = start
+                break
+
+            frames = np.frombuffer(data, FRAME_DTYPE, count=n, offset=start)
+            misaligned = np.flatnonzero(frames["sync"] != SYNC_WORD)
+            n_aligned = misaligned[0] if len(misaligned) else n
+            crcs = frames["crc"][:n_aligned].tolist()
+            n_valid = n_aligned
+            for i, crc in enumerate(crcs):
+                offset = start + i * FRAME_SIZE
+                if crc16(data[offset + 2:offset + FRAME_SIZE - 2]) != crc:
+                    n_valid = i
+                    break
+            accepted.append(frames[:n_valid])
+            pos = start + n_valid * FRAME_SIZE
+            if n_valid < n_aligned:
+                # corrupted frame, resync after its sync word
+                self.crc_errors += 1
+                self.skipped_bytes += 1
+                pos += 1
+            elif n_valid < n:
+                # a sync word inside the data of the previous frame, search from here
+                continue
+        self.pending = data[pos:]
+
+        frames = np.concatenate(accepted) if accepted else np.empty(0, FRAME_DTYPE)
+        seqs = frames["seq"].astype(np.int64)
+        if len(seqs):
+            previous = seqs[0] - 1 if self.last_seq is None else self.last_seq
+            self.lost += int(np.sum((np.diff(np.r_[previous, seqs]) - 1) % 65536))
+            self.last_seq = int(seqs[-1])
+        self.frames += len(frames)
+        return seqs, frames["values"].astype(np.float32)
+
+
+if __name__ == "__main__":
+    # Decode a simulated stream with garbage and a corrupted byte, then compare the cost per
+    # sample with the ASCII lines parsed by serial_reader.parse_line
+    from serial_reader import parse_line
+
+    n = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    rng = np.random.default_rng(0)
+    values = np.round(rng.uniform(-2, 2, (n, 6)) * [1, 1, 1, 250, 250, 250], 3).astype(np.float32)
+    stream = bytearray(b"Failed to init\r\n" + b"".join(encode_frame(i, row) for i, row in enumerate(values)))
+    stream[16 + 10 * FRAME_SIZE + 7] ^= 0xFF  # corrupt frame 10
+
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    chunks = [decoder.feed(stream[i:i + 4096]) for i in range(0, len(stream), 4096)]
+    binary_time = time.perf_counter() - start
+    seqs = np.concatenate([seq for seq, _ in chunks])
+    decoded = np.concatenate([rows for _, rows in chunks])
+    assert np.array_equal(seqs, np.delete(np.arange(n) % 65536, 10)) and np.array_equal(decoded, np.delete(values, 10, axis=0))
+    assert (decoder.crc_errors, decoder.lost) == (1, 1)
+
+    lines = [",".join(f"{v:.3f}" for v in row).encode() + b"\r\n" for row in values]
+    start = time.perf_counter()
+    parsed = [parse_line(line) for line in lines]
+    ascii_time = time.perf_counter() - start
+    assert np.array_equal(np.stack(parsed), values)
+
+    print(f"binary: {n} frames in {binary_time:.3f}s ({binary_time / n * 1e6:.2f} us/sample, {FRAME_SIZE} bytes)")
+    print(f"ascii:  {n} lines  in {ascii_time:.3f}s ({ascii_time / n * 1e6:.2f} us/sample, "
+          f"{sum(map(len, lines)) / n:.0f} bytes)")
@@ -0,0 +1,259 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from sensor_protocol import FrameDecoder, ASCII_BAUDRATE, BINARY_BAUDRATE
+
+##############################################
+########### dual serial reader ###############
+##############################################
+
+# One reader thread per board, so a stalled board never delays the other one. Every line is
+# timestamped on receipt, and the two streams are joined by nearest timestamp into 12-channel
+# frames: L-Acc, L-Gyr, R-Acc, R-Gyr, raw sensor units.
+#
+# protocol "ascii" reads the CSV lines of arduino_stream.ino, "binary" the framed stream of
+# BINARY_STREAM 1 (sensor_protocol.py), decoded per chunk of bytes instead of per line.
+
+def parse_line(line):
+    """
+    Six sensor values from "aX,aY,aZ,gX,gY,gZ" (arduino_stream.ino) or
+    "ACC:aX,aY,aZ; GYR:gX,gY,gZ". Returns a float32 array of 6, or None.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='ignore')
+    line = line.replace("ACC:", "").replace("GYR:", "").replace(";", ",")
+    try:
+        values = [float(part) for part in line.split(',') if part.strip()]
+    except ValueError:
+        return None
+    if len(values) != 6:
+        return None
+    return np.array(values, dtype=np.float32)
+
+
+class SampleDecoder:
+    """
+    Sensor values from the bytes of one board, in whatever pieces they arrive: readline()
+    results, read() chunks or asyncio data_received() calls.
+
+    protocol "ascii" keeps an incomplete last line until its newline arrives, "binary"
+    decodes frames with sensor_protocol.FrameDecoder.
+    """
+
+    def __init__(self, protocol="ascii", parse=parse_line):
+        if protocol not in ("ascii", "binary"):
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.protocol = protocol
+        self.parse = parse
+        self.frame_decoder = FrameDecoder() if protocol == "binary" else None
+        self.pending = b""
+        # counters
+        self.lines = 0
+        self.parse_errors = 0
+
+    @property
+    def baudrate(self):
+        return BINARY_BAUDRATE if self.protocol == "binary" else ASCII_BAUDRATE
+
+    def feed(self, data):
+        # Values of the samples completed by data, possibly none
+        if self.frame_decoder is not None:
+            _, values = self.frame_decoder.feed(data)
+            self.lines = self.frame_decoder.frames
+            self.parse_errors = self.frame_decoder.crc_errors
+            return values
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        samples = []
+        for line in lines:
+            if not line.strip():
+                continue
+            self.lines += 1
+            values = self.parse(line)
+            if values is None:
+                self.parse_errors += 1
+            else:
+                samples.append(values)
+        return samples
+
+    def stats(self, name):
+        stats = {f"parse_errors_{name}": self.parse_errors}
+        if self.frame_decoder is not None:
+            stats[f"lost_{name}"] = self.frame_decoder.lost
+        return stats
+
+
+class TimestampJoiner:
+    """
+    Pairs the samples of two streams by nearest receipt time.
+
+    left and right are deques of (receipt time, values) that the readers append to. The
+    older head sample of the two is dropped when the other stream has no sample within
+    max_skew seconds, or when its own next sample is closer to the other head. Frames
+    pairing samples further apart than skew_warning are counted as skewed.
+    """
+
+    def __init__(self, left, right, max_skew=0.1, skew_warning=0.03):
+        self.left = left
+        self.right = right
+        self.max_skew = max_skew
+        self.skew_warning = skew_warning
+        # counters
+        self.frames_joined = 0
+        self.dropped = {"left": 0, "right": 0}
+        self.skewed = 0
+        self.max_skew_seen = 0.0
+
+    def join_next(self):
+        # Next aligned frame from the samples received so far, or None
+        left, right = self.left, self.right
+        while left and right:
+            if left[0][0] <= right[0][0]:
+                older, older_name, other = left, "left", right
+            else:
+                older, older_name, other = right, "right", left
+            skew = other[0][0] - older[0][0]
+            too_far = skew > self.max_skew
+            # the other head is closer to the next sample of this stream
+            superseded = len(older) > 1 and abs(older[1][0] - other[0][0]) < skew
+            if too_far or superseded:
+                older.popleft()
+                self.dropped[older_name] += 1
+                continue
+
+            (left_time, left_values), (right_time, right_values) = left.popleft(), right.popleft()
+            self.frames_joined += 1
+            self.max_skew_seen = max(self.max_skew_seen, skew)
+            if skew > self.skew_warning:
+                self.skewed += 1
+            # the frame is complete when its later sample arrived
+            return max(left_time, right_time), np.concatenate([left_values, right_values])
+        return None
+
+    def stats(self):
+        return {
+            "frames": self.frames_joined,
+            "dropped_left": self.dropped["left"],
+            "dropped_right": self.dropped["right"],
+            "skewed": self.skewed,
+            "max_skew": self.max_skew_seen,
+        }
+
+
+class PortReader(threading.Thread):
+    """
+    Reads one board on its own thread into a bounded deque of (receipt time, values).
+
+    source is a port name, opened with pyserial, or any object with readline() (ascii) or
+    read() (binary) and close(). Samples decoded from one binary chunk share its receipt time.
+    """
+
+    def __init__(self, source, name, baudrate=None, condition=None, maxlen=256, parse=parse_line,
+                 protocol="ascii"):
+        super().__init__(name=f"serial-{name}", daemon=True)
+        self.decoder = SampleDecoder(protocol, parse)
+        if isinstance(source, str):
+            import serial
+            # the timeout lets the thread notice close()
+            source = serial.Serial(source, baudrate or self.decoder.baudrate, timeout=0.5)
+        self.source = source
+        # shared with the joiner, which pops from samples while holding it
+        self.condition = condition if condition is not None else threading.Condition()
+        self.samples = deque()
+        self.maxlen = maxlen
+        self.stopped = False
+        self.overflows = 0
+
+    def read_samples(self):
+        # Values of the samples in the next line or chunk, possibly none
+        if self.decoder.protocol == "ascii":
+            return self.decoder.feed(self.source.readline())
+        # whatever is buffered, or block for one byte until the timeout
+        return self.decoder.feed(self.source.read(max(1, getattr(self.source, "in_waiting", 0))))
+
+    def run(self):
+        while not self.stopped:
+            try:
+                samples = self.read_samples()
+            except Exception as e:
+                if self.stopped:
+                    return
+                print(f"[{self.name}] read error: {e}")
+                time.sleep(0.1)
+                continue
+            receipt_time = time.time()
+            if len(samples) == 0:
+                continue
+            with self.condition:
+                for values in samples:
+                    if len(self.samples) >= self.maxlen:
+                        # the joiner is not keeping up, lose the oldest sample
+                        self.samples.popleft()
+                        self.overflows += 1
+                    self.samples.append((receipt_time, values))
+                self.condition.notify()
+
+    def close(self):
+        self.stopped = True
+        self.source.close()
+
+
+class DualSerialReader:
+    """
+    Left and right board joined into aligned frames by a TimestampJoiner.
+
+    Usage:
+        reader = DualSerialReader(ARDUINO_PORT_LEFT, ARDUINO_PORT_RIGHT, protocol="binary")
+        reader.start()
+        for timestamp, frame in reader.frames():    # frame: (12,) float32
+            ...
+        print(reader.stats())
+        reader.close()
+    """
+
+    def __init__(self, left, right, baudrate=None, max_skew=0.1, skew_warning=0.03, parse=parse_line,
+                 protocol="ascii"):
+        self.condition = threading.Condition()
+        self.left = PortReader(left, "left", baudrate, self.condition, parse=parse, protocol=protocol)
+        self.right = PortReader(right, "right", baudrate, self.condition, parse=parse, protocol=protocol)
+        self.joiner = TimestampJoiner(self.left.samples, self.right.samples, max_skew, skew_warning)
+
+    def start(self):
+        self.left.start()
+        self.right.start()
+        return self
+
+    def close(self):
+        self.left.close()
+        self.right.close()
+        with self.condition:
+            self.condition.notify_all()
+
+    def read_frame(self, timeout=None):
+        # Blocks until the next frame, None on timeout or after close()
+        with self.condition:
+            while True:
+                frame = self.joiner.join_next()
+                if frame is not None:
+                    return frame
+                if self.left.stopped or self.right.stopped:
+                    return None
+                if not self.condition.wait(timeout):
+                    return None
+
+    def frames(self):
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def stats(self):
+        return {
+            **self.joiner.stats(),
+            **self.left.decoder.stats("left"),
+            **self.right.decoder.stats("right"),
+            "overflows_left": self.left.overflows,
+            "overflows_right": self.right.overflows,
+        }
@@ -0,0 +1,183 @@
+import sys
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataset import GestureDataset, normalize_rows
+
+##############################################
+######## streaming training windows ##########
+##############################################
+
+# Training windows drawn from the compiled dataset (dataset.py) batch by batch, augmented on
+# the fly, so no augmented copy of the corpus is ever held in memory. Augmentation works in
+# sensor units, then the windows are normalized like normalize() in live_keras.py.
+#
+#   stream = WindowStream(GestureDataset(), users=["user_1", "user_2"], time_warp=0.2)
+#   model.fit(stream.tf_dataset(batch_size=64), epochs=20)              # keras
+#   for X, y in stream.batches(batch_size=256): clf.partial_fit(...)    # sklearn, numpy
+
+ACC_RANGE = 2.0     # g, the range of normalize()
+GYR_RANGE = 500.0   # degrees per second
+# scale of every channel: L-Acc, L-Gyr, R-Acc, R-Gyr
+CHANNEL_RANGE = np.tile(np.repeat([ACC_RANGE, GYR_RANGE], 3), 2).astype(np.float32)
+
+
+def denormalize_rows(features):
+    # Inverse of normalize_rows, exact up to the clipping of normalize()
+    return (features * CHANNEL_RANGE).astype(np.float32)
+
+
+def time_warp(windows, sigma, rng):
+    # Resample every window along a smooth random time axis: the speed at 4 knots is
+    # 1 + N(0, sigma), integrated and rescaled to span the window
+    n, size, _ = windows.shape
+    knots = np.clip(1 + rng.normal(0, sigma, (n, 4)), 0.1, None)
+    # linear interpolation of the knots as a (4, size) matrix
+    interpolation = np.stack([np.interp(np.linspace(0, 3, size), np.arange(4), np.eye(4)[k]) for k in range(4)])
+    speed = knots @ interpolation
+    position = np.cumsum(speed, axis=1) - speed[:, :1]
+    position *= (size - 1) / np.maximum(position[:, -1:], 1e-6)
+    left = np.clip(np.floor(position).astype(np.int64), 0, size - 2)
+    weight = (position - left)[:, :, np.newaxis].astype(np.float32)
+    rows = np.arange(n)[:, np.newaxis]
+    return windows[rows, left] * (1 - weight) + windows[rows, left + 1] * weight
+
+
+class WindowStream:
+    """
+    Windows of a GestureDataset selection as shuffled, augmented batches.
+
+    Args:
+        dataset (GestureDataset): Compiled recordings.
+        window_size, stride (int): Window length and step in samples.
+        users, letters: Selection, None for all.
+        normalize (bool): Map to [-1, 1] like live_keras.normalize(), else sensor units.
+        time_warp (float): Std of the random speed change, 0 to turn it off.
+        jitter (float): Std of the Gaussian noise as a fraction of each channel's range
+            (2 g, 500 dps), 0 to turn it off.
+        swap_prob (float): Probability of swapping the left and right board. The label is
+            kept, so only use it for gestures that do not depend on the hand.
+        classes (list, optional): Label order of y, defaults to the sorted selected letters
+            (the order of sklearn's LabelEncoder).
+        seed (int, optional): Makes shuffling and augmentation reproducible.
+    """
+
+    def __init__(self, dataset, window_size=8, stride=1, users=None, letters=None, normalize=True,
+                 time_warp=0.0, jitter=0.0, swap_prob=0.0, classes=None, seed=None):
+        self.dataset = dataset
+        self.window_size = window_size
+        self.normalize = normalize
+        self.time_warp = time_warp
+        self.jitter = jitter
+        self.swap_prob = swap_prob
+        self.seed = seed
+
+        self.starts, labels = dataset.window_starts(window_size, stride, users, letters)
+        self.classes = np.array(sorted(set(labels.tolist())) if classes is None else classes)
+        self.y = np.searchsorted(self.classes, labels).astype(np.int32)
+        # recordings of processed_data only exist normalized
+        recording = np.searchsorted(dataset.index["end"], self.starts, side="right")
+        self.pre_normalized = dataset.index["normalized"][recording]
+        self.raw_view = dataset.window_view(window_size, raw=True)
+        self.feature_view = dataset.window_view(window_size)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def augmented(self):
+        return self.time_warp > 0 or self.jitter > 0 or self.swap_prob > 0
+
+    def make_batch(self, indices, seed=None):
+        """
+        Windows and labels of some positions of the stream, augmented and normalized.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: (n, window_size, 12) float32 and (n,) int32.
+        """
+        indices = np.asarray(indices)
+        starts, pre_normalized = self.starts[indices], self.pre_normalized[indices]
+        if self.normalize and not self.augmented:
+            # nothing to do in sensor units, the store is normalized already
+            return np.asarray(self.feature_view[starts], dtype=np.float32), self.y[indices]
+
+        windows = np.asarray(self.raw_view[starts], dtype=np.float32)
+        if pre_normalized.any():
+            windows[pre_normalized] = denormalize_rows(self.feature_view[starts[pre_normalized]])
+        # tf.data.Dataset.random gives signed seeds
+        rng = np.random.default_rng(None if seed is None else abs(int(seed)))
+        if self.time_warp > 0:
+            windows = time_warp(windows, self.time_warp, rng)
+        if self.jitter > 0:
+            windows += rng.normal(0, self.jitter, windows.shape).astype(np.float32) * CHANNEL_RANGE
+        if self.swap_prob > 0:
+            swap = rng.random(len(windows)) < self.swap_prob
+            windows[swap] = np.roll(windows[swap], 6, axis=2)
+        if self.normalize:
+            windows = normalize_rows(windows)
+        return windows.astype(np.float32), self.y[indices]
+
+    def batch_indices(self, batch_size, shuffle, rng):
+        order = rng.permutation(len(self)) if shuffle else np.arange(len(self))
+        return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    def batches(self, batch_size=256, shuffle=True, epochs=1, workers=4, prefetch=8):
+        """
+        NumPy batches for the sklearn path. Batches are built on a thread pool, up to
+        prefetch of them ahead of the consumer.
+        """
+        rng = np.random.default_rng(self.seed)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in range(epochs):
+                batch_indices = self.batch_indices(batch_size, shuffle, rng)
+                jobs = list(zip(batch_indices, rng.integers(0, 2 ** 63, len(batch_indices)).tolist()))
+                pending = deque(pool.submit(self.make_batch, *job) for job in jobs[:prefetch])
+                for i in range(len(jobs)):
+                    batch = pending.popleft().result()
+                    if i + prefetch < len(jobs):
+                        pending.append(pool.submit(self.make_batch, *jobs[i + prefetch]))
+                    yield batch
+
+    def tf_dataset(self, batch_size=64, shuffle=True):
+        """
+        tf.data pipeline for model.fit: shuffled positions, batched, built by make_batch in
+        parallel calls and prefetched. Every epoch reshuffles and draws new augmentations.
+        """
+        import tensorflow as tf
+
+        positions = tf.data.Dataset.range(len(self))
+        if shuffle:
+            positions = positions.shuffle(len(self), seed=self.seed, reshuffle_each_iteration=True)
+        positions = positions.batch(batch_size)
+        # new augmentation seeds on every pass, a fixed seed still makes the epoch sequence reproducible
+        seeds = tf.data.Dataset.random(seed=self.seed, rerandomize_each_iteration=True)
+
+        def load(indices, seed):
+            X, y = tf.numpy_function(self.make_batch, [indices, seed], [tf.float32, tf.int32])
+            X.set_shape((None, self.window_size, self.feature_view.shape[2]))
+            y.set_shape((None,))
+            return X, y
+
+        return (tf.data.Dataset.zip((positions, seeds))
+                .map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=self.seed is not None)
+                .prefetch(tf.data.AUTOTUNE))
+
+
+if __name__ == "__main__":
+    # Throughput of one augmented epoch, and memory of the augmented copy it replaces
+    dataset = GestureDataset()
+    stream = WindowStream(dataset, time_warp=0.2, jitter=0.01, seed=0)
+    start = time.perf_counter()
+    n = sum(len(y) for _, y in stream.batches(batch_size=256))
+    print(f"numpy: {n} augmented windows in {time.perf_counter() - start:.2f}s "
+          f"(a materialized epoch would take {n * stream.window_size * 12 * 4 / 2 ** 20:.0f} MiB)")
+    if len(sys.argv) >= 2 and sys.argv[1] == "--tf":
+        start = time.perf_counter()
+        n = sum(len(y) for _, y in stream.tf_dataset(batch_size=256).as_numpy_iterator())
+        print(f"tf.data: {n} augmented windows in {time.perf_counter() - start:.2f}s")
+        # every epoch has to draw new augmentations, also without shuffling
+        ordered = stream.tf_dataset(batch_size=256, shuffle=False)
+        first, second = (next(ordered.as_numpy_iterator())[0] for _ in range(2))
+        assert not np.array_equal(first, second), "tf_dataset repeats the augmentations of the previous epoch"
+        print("tf.data: new augmentations every epoch")
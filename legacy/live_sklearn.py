@@ -1,4 +1,5 @@
-import serial
+import os
+import sys
 import socket
 import numpy as np
 import pickle
@@ -7,13 +8,18 @@ import time
 import threading
 import queue
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "P2-gesture-interaction"))
+from serial_reader import DualSerialReader
+
 #### 串口配置 ####
 ARDUINO_PORT_LEFT = '/dev/cu.usbmodem13401'  # 左板
 ARDUINO_PORT_RIGHT = '/dev/cu.usbmodem13201'  # 右板
 
-# 优化串口通信配置：提高波特率和降低超时
-ser_left = serial.Serial(ARDUINO_PORT_LEFT, 9600, timeout=0.4)
-ser_right = serial.Serial(ARDUINO_PORT_RIGHT, 9600, timeout=0.4)
+# "binary" for arduino_stream.ino with BINARY_STREAM 1 (115200 baud), "ascii" for CSV lines (9600 baud)
+SERIAL_PROTOCOL = "binary"
+
+# 每块板一个读取线程，按接收时间配对，波特率由协议决定
+reader = DualSerialReader(ARDUINO_PORT_LEFT, ARDUINO_PORT_RIGHT, protocol=SERIAL_PROTOCOL)
 
 #### UDP配置 ####
 UDP_IP = "127.0.0.1"
@@ -55,78 +61,16 @@ prediction_to_key = {
     'f': 'F', 'b': 'B','m': 'N', 'n': 'N'
 }
 
-# 优化数据处理函数
-def process_data(line, side):
-    """优化的数据处理函数"""
-    if not line:
-        return None
-    try:
-        # 使用更高效的分割方法
-        line_clean = line.replace(";", ",")
-        parts = line_clean.split(',')
-        values = []
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            # 移除已知标签
-            for prefix in ["ACC:", "GYR:"]:
-                if part.startswith(prefix):
-                    part = part.replace(prefix, "")
-            try:
-                values.append(float(part))
-            except Exception:
-                continue
-                
-        if len(values) != 6:
-            return None
-            
-        # 一次性标准化
-        return np.array([
-            values[0]/8, values[1]/8, values[2]/8,
-            values[3]/4000, values[4]/4000, values[5]/4000
-        ], dtype=np.float32)
-    except Exception as e:
-        print(f"[{side}] 数据处理失败: {str(e)}")
-        return None
-
-# 非阻塞读取函数
-def read_serial_nonblocking(ser):
-    if ser.in_waiting > 0:
-        return ser.readline().decode('utf-8', errors='ignore').strip()
-    return None
+# 标准化: 加速度 /8, 角速度 /4000, 左右板相同
+SCALE = np.tile(np.array([1/8, 1/8, 1/8, 1/4000, 1/4000, 1/4000], dtype=np.float32), 2)
 
 # 数据采集线程
 def data_collection_thread():
     print("数据采集线程启动")
-    while True:
-        try:
-            # 非阻塞读取
-            line_left = read_serial_nonblocking(ser_left)
-            line_right = read_serial_nonblocking(ser_right)
-            
-            # 如果两个传感器都有数据时才处理
-            if line_left and line_right:
-                processed_left = process_data(line_left, "LEFT")
-                processed_right = process_data(line_right, "RIGHT")
-                
-                if processed_left is not None and processed_right is not None:
-                    # 合并特征
-                    combined = np.concatenate([processed_left, processed_right])
-                    
-                    # 线程安全地更新buffer
-                    with buffer_lock:
-                        buffer.append(combined)
-            
-            # 短暂休眠，减轻CPU负担            
-            time.sleep(0.005)  # 5ms延迟，避免过度轮询
-                
-        except serial.SerialException as se:
-            print(f"串口错误: {str(se)}")
-            time.sleep(1)
-        except Exception as e:
-            print(f"数据采集异常: {str(e)}")
-            time.sleep(0.5)
+    for _, frame in reader.frames():
+        # 线程安全地更新buffer
+        with buffer_lock:
+            buffer.append(frame * SCALE)
 
 # 预测线程
 def prediction_thread():
@@ -172,6 +116,7 @@ def prediction_thread():
 def main():
     try:
         # 创建并启动线程
+        reader.start()
         data_thread = threading.Thread(target=data_collection_thread, daemon=True)
         pred_thread = threading.Thread(target=prediction_thread, daemon=True)
         
@@ -189,8 +134,7 @@ def main():
     finally:
         # 清理资源
         try:
-            ser_left.close()
-            ser_right.close()
+            reader.close()
             sock.close()
         except:
             pass